@@ -0,0 +1,180 @@
+import re
+import sys
+from pathlib import Path
+from exporter import export_files, split_export, write_diffs, write_export, write_jsonl
+from git_changes import ChangeDiffs, changed_files
+from gitignore import translate_pattern, relpath
+from profiling import NULL_TRACE
+from scanner import iter_folder, DirNode, ContentFilter
+from structure import render_structure
+from tokens import fit_budget
+
+# --- Scanning --- #
+
+def scan(root, max_file_bytes=None, sniff=True, use_index=False, tree=None,
+         with_tokens=False, trace=NULL_TRACE, git_files=None, changed_since=None):
+    """
+    Return the files under `root` that pass Otter's filters, in walk order.
+    With `with_tokens`, return (path, estimated tokens) pairs instead.
+    Pass a profiling.Trace to collect stage timings and skip counters.
+    `git_files` ("tracked" or "tracked+untracked") reads file names from
+    the git index of a checkout instead of walking it. `changed_since`
+    (a git ref) keeps only files changed against it or untracked;
+    nothing else is read.
+    """
+    root = Path(root)
+    rel_paths = None
+    if changed_since is not None:
+        changes = changed_files(root, changed_since)
+        rel_paths = [path for path, status in changes.items() if status != "D"]
+    index = None
+    if use_index:
+        from scan_index import ScanIndex
+        index = ScanIndex(root)
+    content_filter = ContentFilter(max_file_bytes=max_file_bytes, sniff=sniff)
+    return list(iter_folder(
+        root, index=index, tree=tree, content_filter=content_filter,
+        with_tokens=with_tokens, trace=trace, git_files=git_files,
+        rel_paths=rel_paths,
+    ))
+
+def scan_table(root, max_file_bytes=None, sniff=True, use_index=False, tree=None,
+               trace=NULL_TRACE, git_files=None):
+    """
+    Like scan(), but return a compact file_table.FileTable (relative
+    paths, tokens, sizes and mtimes) instead of a list of Paths; better
+    for very large folders.
+    """
+    from file_table import FileTable
+    root = Path(root)
+    index = None
+    if use_index:
+        from scan_index import ScanIndex
+        index = ScanIndex(root)
+    content_filter = ContentFilter(max_file_bytes=max_file_bytes, sniff=sniff)
+    table = FileTable(root)
+    for record in iter_folder(
+        root, index=index, tree=tree, content_filter=content_filter,
+        trace=trace, git_files=git_files, records=True,
+    ):
+        table.add(*record)
+    return table
+
+def scan_tree(root, **options):
+    """Like scan(), but also return the DirNode tree for structure rendering."""
+    root = Path(root)
+    tree = DirNode(root.name)
+    files = scan(root, tree=tree, **options)
+    return files, tree
+
+# --- Filtering --- #
+
+def compile_globs(patterns):
+    """
+    Compile gitignore-style globs into one regex. A pattern matches a
+    path or anything below a matching directory; patterns without "/"
+    match at any depth.
+    """
+    patterns = [p.rstrip("/") for p in patterns if p and p.rstrip("/")]
+    if not patterns:
+        return None
+    body = "|".join(f"(?:{translate_pattern(p)})" for p in patterns)
+    return re.compile(f"(?:{body})(?:/.*)?", re.DOTALL)
+
+def filter_paths(paths, root, include=(), exclude=()):
+    """
+    Keep paths (relative to `root`) matching any include glob and no
+    exclude glob. Also accepts (path, tokens) pairs from scan().
+    """
+    include_re = compile_globs(include)
+    exclude_re = compile_globs(exclude)
+    if include_re is None and exclude_re is None:
+        return list(paths)
+
+    kept = []
+    for p in paths:
+        rel = relpath(p[0] if isinstance(p, tuple) else p, root)
+        if include_re is not None and not include_re.fullmatch(rel):
+            continue
+        if exclude_re is not None and exclude_re.fullmatch(rel):
+            continue
+        kept.append(p)
+    return kept
+
+def grep(paths, pattern: str, processes=None):
+    """
+    Keep the paths (or (path, tokens) pairs) whose file contents match the
+    regex `pattern`; binary files never match. See content_search.
+    """
+    from content_search import search_files
+    paths = list(paths)
+    keys = [p[0] if isinstance(p, tuple) else p for p in paths]
+    return [paths[i] for i in search_files(keys, pattern, processes=processes)]
+
+def fit_token_budget(entries, budget: int, priority: str = "order"):
+    """Keep the (path, tokens) pairs that fit into `budget` (see tokens.fit_budget)."""
+    chosen = fit_budget([tokens for _, tokens in entries], budget, priority)
+    return [entries[i] for i in chosen]
+
+# --- Output --- #
+
+def export(paths, out_path=None, max_file_bytes=None, workers=None, cache=None,
+           fmt="text", root=None, dedupe=False, near_duplicates=False, diff_ref=None,
+           split_limit=None, split_unit="bytes", split_weights=None):
+    """
+    Export files in one of exporter.OUTPUT_FORMATS to `out_path`, or to
+    stdout when `out_path` is None or "-" (text and jsonl only). Archive
+    and JSONL names are relative to `root`. Pass a read_cache.ReadCache
+    to reuse file contents across text exports. With `dedupe`, text
+    exports write repeated files once (`near_duplicates` also collapses
+    similar small files into diffs). With `diff_ref` (a git ref), text
+    exports hold each file's unified diff against it instead of its
+    contents; `root` must then be set. With `split_limit`, text exports
+    are written as parts of at most that many bytes or tokens
+    (`split_unit`) next to `out_path`, plus an index file; `split_weights`
+    may give each file's size in that unit (e.g. the scan's token
+    estimates). Returns an ExportResult.
+    """
+    options = {"max_file_bytes": max_file_bytes}
+    if workers is not None:
+        options["workers"] = workers
+    text_options = {"cache": cache, "dedupe": None}
+    if dedupe or near_duplicates:
+        from dedupe import Deduplicator
+        text_options["dedupe"] = Deduplicator(near=near_duplicates)
+    diff = None
+    if diff_ref is not None:
+        if root is None:
+            raise ValueError("diff exports need the project root")
+        diff = ChangeDiffs(root, diff_ref)
+
+    if split_limit is not None:
+        if diff is not None:
+            raise ValueError("diff exports cannot be split")
+        if out_path is None or str(out_path) == "-":
+            raise ValueError("split exports need an output file")
+        return split_export(
+            paths, Path(out_path), split_limit, split_unit, split_weights,
+            fmt=fmt, root=root, **text_options, **options,
+        )
+
+    if out_path is None or str(out_path) == "-":
+        if diff is not None and fmt == "text":
+            return write_diffs(sys.stdout, paths, diff, **options)
+        if fmt == "text":
+            return write_export(sys.stdout, paths, **text_options, **options)
+        if fmt == "jsonl":
+            return write_jsonl(sys.stdout, paths, root, **options)
+        raise ValueError(f"the {fmt} format needs an output file")
+    if diff is not None:
+        return export_files(paths, Path(out_path), fmt=fmt, root=root, diff=diff, **options)
+    return export_files(paths, Path(out_path), fmt=fmt, root=root, **text_options, **options)
+
+def structure(root, max_depth=None, max_entries=None, **options) -> str:
+    """
+    Return the ASCII project tree for `root`, optionally limited to
+    `max_depth` levels and `max_entries` entries per folder.
+    """
+    _, tree = scan_tree(root, **options)
+    with options.get("trace", NULL_TRACE).stage("structure"):
+        return render_structure(tree, max_depth, max_entries)
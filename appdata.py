@@ -0,0 +1,17 @@
+import os
+import sys
+from pathlib import Path
+
+# --- Per-user application data --- #
+
+def get_app_dir() -> Path:
+    """Return the per-user data folder (created on first use)."""
+    if sys.platform.startswith("win"):
+        base_dir = Path(os.getenv("APPDATA", Path.home()))
+    elif sys.platform == "darwin":
+        base_dir = Path.home() / "Library" / "Application Support"
+    else:
+        base_dir = Path.home() / ".local" / "share"
+
+    base_dir.mkdir(parents=True, exist_ok=True)
+    return base_dir
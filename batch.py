@@ -0,0 +1,133 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import api
+
+# --- Batch export --- #
+
+class RepoResult:
+    """Outcome of exporting one repository in a batch."""
+
+    __slots__ = (
+        "root", "output", "files", "skipped", "scan_seconds", "export_seconds", "error",
+    )
+
+    def __init__(self, root, output):
+        self.root = root
+        self.output = output
+        self.files = 0
+        # Files left out by the token budget
+        self.skipped = 0
+        self.scan_seconds = 0.0
+        self.export_seconds = 0.0
+        self.error = None
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+def read_manifest(path: Path):
+    """Read repository roots from a manifest: one per line, '#' comments allowed."""
+    base = Path(path).parent
+    roots = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        root = Path(line).expanduser()
+        roots.append(root if root.is_absolute() else base / root)
+    return roots
+
+def output_name(root: Path, used: set, suffix=".txt") -> str:
+    """Unique "<folder>_export<suffix>" name for a root within one batch."""
+    stem = Path(root).resolve().name or "root"
+    name = f"{stem}_export{suffix}"
+    n = 2
+    while name in used:
+        name = f"{stem}_{n}_export{suffix}"
+        n += 1
+    used.add(name)
+    return name
+
+def export_repo(root, output, include=(), exclude=(), options=None):
+    """
+    Scan and export one repository (runs in a worker process). `options`
+    holds api.scan and api.export keyword arguments under "scan" and
+    "export", plus optional "grep", "token_budget", "priority" and
+    "read_cache" settings applied as on the command line.
+    """
+    result = RepoResult(str(root), str(output))
+    options = options or {}
+    try:
+        if not Path(root).is_dir():
+            raise NotADirectoryError(f"not a folder: {root}")
+        export_options = dict(options.get("export", {}))
+        budget = options.get("token_budget")
+        split_tokens = bool(export_options.get("split_limit")) and (
+            export_options.get("split_unit") == "tokens"
+        )
+        with_tokens = budget is not None or split_tokens
+
+        start = time.perf_counter()
+        entries = api.scan(root, with_tokens=with_tokens, **options.get("scan", {}))
+        entries = api.filter_paths(entries, root, include, exclude)
+        if options.get("grep"):
+            # Already one process per repo: search in this process
+            entries = api.grep(entries, options["grep"], processes=1)
+        if budget is not None:
+            total = len(entries)
+            entries = api.fit_token_budget(entries, budget, options.get("priority", "order"))
+            result.skipped = total - len(entries)
+        files = [path for path, _ in entries] if with_tokens else entries
+        if split_tokens:
+            export_options["split_weights"] = [tokens for _, tokens in entries]
+        result.scan_seconds = time.perf_counter() - start
+
+        cache = None
+        if options.get("read_cache"):
+            from read_cache import ReadCache, get_cache_dir
+            cache = ReadCache(disk_dir=get_cache_dir())
+
+        start = time.perf_counter()
+        # One process per repo already saturates the cores: read sequentially
+        api.export(files, output, workers=1, cache=cache, root=root, **export_options)
+        result.export_seconds = time.perf_counter() - start
+        result.files = len(files)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+def export_batch(roots, out_dir: Path, include=(), exclude=(), options=None,
+                 processes=None, on_result=None, suffix=".txt"):
+    """
+    Export every root into `out_dir` using a process pool, one output file
+    per repository (named with `suffix`). Failures are reported per repository instead of
+    aborting the batch. `on_result(result)` is called as each one finishes.
+    Returns the results in the order of `roots`.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    processes = processes or os.cpu_count() or 1
+
+    used = set()
+    jobs = [(Path(root), out_dir / output_name(root, used, suffix)) for root in roots]
+    results = [None] * len(jobs)
+
+    with ProcessPoolExecutor(max_workers=min(processes, max(1, len(jobs)))) as pool:
+        futures = {
+            pool.submit(export_repo, root, output, tuple(include), tuple(exclude), options): i
+            for i, (root, output) in enumerate(jobs)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. out of memory)
+                result = RepoResult(str(jobs[i][0]), str(jobs[i][1]))
+                result.error = f"{type(e).__name__}: {e}"
+            results[i] = result
+            if on_result is not None:
+                on_result(result)
+
+    return results
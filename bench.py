@@ -0,0 +1,276 @@
+import argparse
+import builtins
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from exporter import export_files
+from read_cache import ReadCache
+from scan_index import ScanIndex, RACY_WINDOW_NS
+from scanner import iter_folder, DirNode, ContentFilter
+from structure import render_structure
+
+# --- Synthetic repositories --- #
+
+EXTENSIONS = (".py", ".js", ".ts", ".go", ".rs", ".java", ".md", ".json", ".css", ".html")
+WORDS = ("def", "return", "value", "self", "import", "class", "for", "in", "if", "else",
+         "const", "let", "function", "node", "item", "index", "result", "data")
+
+def make_content(rng: random.Random, size: int) -> str:
+    """Source-like text of roughly `size` bytes."""
+    lines = []
+    total = 0
+    while total < size:
+        indent = "    " * rng.randint(0, 3)
+        line = indent + " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 10)))
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)[:size]
+
+def make_gitignore(rules: int) -> list:
+    """`rules` gitignore lines mixing the pattern kinds git supports."""
+    lines = ["# synthetic rules", "*.log", "build/"]
+    for i in range(rules):
+        kind = i % 5
+        if kind == 0:
+            lines.append(f"*.tmp{i}")
+        elif kind == 1:
+            lines.append(f"cache{i}/")
+        elif kind == 2:
+            lines.append(f"**/gen{i}/**")
+        elif kind == 3:
+            lines.append(f"/docs{i}/*.md")
+        else:
+            lines.append(f"!keep{i}.tmp{i - 4}")
+    return lines
+
+def generate_repo(root: Path, depth=3, fanout=4, files_per_dir=10, min_size=200,
+                  max_size=4000, gitignore_rules=20, heavy_dirs=2, heavy_files=500, seed=1):
+    """
+    Create a synthetic repository under `root` and return a summary dict.
+    Heavy dirs imitate node_modules: many small files the scanner prunes.
+    """
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    (root / ".gitignore").write_text("\n".join(make_gitignore(gitignore_rules)) + "\n", encoding="utf-8")
+    counts = {"dirs": 0, "files": 0, "bytes": 0}
+
+    def write(path: Path):
+        text = make_content(rng, rng.randint(min_size, max_size))
+        path.write_text(text, encoding="utf-8")
+        counts["files"] += 1
+        counts["bytes"] += len(text)
+
+    def fill(path: Path, level: int):
+        counts["dirs"] += 1
+        for i in range(files_per_dir):
+            write(path / f"file{i}{rng.choice(EXTENSIONS)}")
+        # A few files that gitignore rules match
+        if gitignore_rules:
+            write(path / f"trace{level}.log")
+        if level < depth:
+            for i in range(fanout):
+                child = path / f"dir{i}"
+                child.mkdir()
+                fill(child, level + 1)
+
+    fill(root, 0)
+
+    for h in range(heavy_dirs):
+        heavy = root / f"pkg{h}" / "node_modules"
+        heavy.mkdir(parents=True)
+        for i in range(heavy_files):
+            lib = heavy / f"lib{i % 50}"
+            lib.mkdir(exist_ok=True)
+            write(lib / f"index{i}.js")
+
+    return counts
+
+# --- Measurement --- #
+
+class SyscallCounter:
+    """Count the filesystem calls Otter makes by wrapping os/builtins functions."""
+
+    TARGETS = ((os, "stat"), (os, "lstat"), (os, "scandir"), (builtins, "open"))
+
+    def __init__(self):
+        self.counts = {}
+        self._saved = []
+
+    def __enter__(self):
+        for module, name in self.TARGETS:
+            original = getattr(module, name)
+            self._saved.append((module, name, original))
+            self.counts[name] = 0
+            setattr(module, name, self._wrap(name, original))
+        return self
+
+    def __exit__(self, *exc):
+        for module, name, original in self._saved:
+            setattr(module, name, original)
+        self._saved = []
+
+    def _wrap(self, name, original):
+        counts = self.counts
+
+        def wrapper(*args, **kwargs):
+            counts[name] += 1
+            return original(*args, **kwargs)
+        return wrapper
+
+def measure(stage, memory=True, repeat=1):
+    """
+    Run `stage()` and return wall time (best of `repeat`), filesystem call
+    counts and, optionally, Python peak memory from a separate traced run.
+    """
+    times = []
+    for _ in range(repeat):
+        with SyscallCounter() as counter:
+            start = time.perf_counter()
+            detail = stage()
+            times.append(time.perf_counter() - start)
+
+    result = {
+        "seconds": min(times),
+        "seconds_all": times,
+        "calls": counter.counts,
+        "detail": detail,
+    }
+    if memory:
+        tracemalloc.start()
+        stage()
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+# --- Benchmark stages --- #
+
+def run_benchmarks(root: Path, work: Path, memory=True, repeat=1, workers=None, settle=False):
+    stages = {}
+    state = {}
+
+    def scan():
+        tree = DirNode(root.name)
+        files = list(iter_folder(root, tree=tree, content_filter=ContentFilter()))
+        state["files"], state["tree"] = files, tree
+        return {"files": len(files)}
+
+    index_dir = work / "index"
+    index_dir.mkdir(exist_ok=True)
+
+    def scan_indexed():
+        index = ScanIndex(root, index_dir)
+        files = list(iter_folder(root, index=index, content_filter=ContentFilter()))
+        return {"files": len(files), "index_hits": index.hits, "index_misses": index.misses}
+
+    def structure():
+        text = render_structure(state["tree"])
+        return {"lines": text.count("\n") + 1 if text else 0}
+
+    export_options = {} if workers is None else {"workers": workers}
+
+    def export():
+        result = export_files(state["files"], work / "export.txt", **export_options)
+        return {"files": result.files, "bytes_read": result.bytes_read,
+                "output_bytes": (work / "export.txt").stat().st_size}
+
+    cache = ReadCache()
+
+    def export_cached():
+        cache.hits = cache.disk_hits = cache.misses = 0
+        result = export_files(state["files"], work / "export.txt", cache=cache, **export_options)
+        return {"files": result.files, **cache.stats()}
+
+    stages["scan"] = measure(scan, memory, repeat)
+    # First run fills the index; the measured runs are warm rescans.
+    # Directories modified within the racy window are never trusted, so
+    # wait it out on freshly generated trees.
+    if settle:
+        time.sleep(RACY_WINDOW_NS / 1e9)
+    scan_indexed()
+    stages["scan_warm_index"] = measure(scan_indexed, memory, repeat)
+    stages["structure"] = measure(structure, memory, repeat)
+    stages["export"] = measure(export, memory, repeat)
+    export_cached()
+    stages["export_warm_cache"] = measure(export_cached, memory, repeat)
+    return stages
+
+# --- Command line --- #
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="otter-bench",
+        description="Benchmark Otter's scan, structure and export stages (JSON output).",
+    )
+    parser.add_argument("--root", help="benchmark an existing folder instead of a synthetic repo")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--files-per-dir", type=int, default=10)
+    parser.add_argument("--min-size", type=int, default=200)
+    parser.add_argument("--max-size", type=int, default=4000)
+    parser.add_argument("--gitignore-rules", type=int, default=20)
+    parser.add_argument("--heavy-dirs", type=int, default=2,
+                        help="node_modules-style folders the scanner should prune")
+    parser.add_argument("--heavy-files", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage (best is reported)")
+    parser.add_argument("--workers", type=int, help="export reader threads")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory runs")
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic repo")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    work = Path(tempfile.mkdtemp(prefix="otter-bench-"))
+
+    try:
+        if args.root:
+            root = Path(args.root).resolve()
+            repo = {"root": str(root)}
+        else:
+            root = work / "repo"
+            config = {
+                "depth": args.depth, "fanout": args.fanout,
+                "files_per_dir": args.files_per_dir,
+                "min_size": args.min_size, "max_size": args.max_size,
+                "gitignore_rules": args.gitignore_rules,
+                "heavy_dirs": args.heavy_dirs, "heavy_files": args.heavy_files,
+                "seed": args.seed,
+            }
+            start = time.perf_counter()
+            counts = generate_repo(root, **config)
+            repo = {"config": config, "generated": counts,
+                    "generate_seconds": time.perf_counter() - start}
+
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repo": repo,
+            "stages": run_benchmarks(
+                root, work, not args.no_memory, args.repeat, args.workers,
+                settle=not args.root,
+            ),
+        }
+    finally:
+        if args.keep and not args.root:
+            print(f"synthetic repo kept at {work / 'repo'}", file=sys.stderr)
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+import argparse
+import re
+import sys
+from pathlib import Path
+import api
+from exporter import OUTPUT_FORMATS, format_available
+from profiling import Trace, new_trace, profiled
+from scanner import GIT_MODES
+from tokens import PRIORITIES, format_tokens
+
+# --- Command line --- #
+
+# Export formats (see exporter.OUTPUT_FORMATS) plus the two listing formats
+FORMATS = tuple(OUTPUT_FORMATS) + ("list", "structure")
+
+def parse_size(value: str) -> int:
+    """Parse sizes like 500000, 512K, 10M or 1G into bytes."""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    value = value.strip().upper().rstrip("B")
+    try:
+        if value and value[-1] in units:
+            return int(float(value[:-1]) * units[value[-1]])
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="otter",
+        description="Export project files into a single text file without the GUI.",
+    )
+    parser.add_argument("roots", nargs="*", metavar="root",
+                        help="project folder(s) to scan; several folders run a batch export")
+    parser.add_argument("-o", "--output", default=None,
+                        help="output file (default: stdout); in batch mode the output folder")
+    parser.add_argument("-m", "--manifest", metavar="FILE",
+                        help="batch mode: read project folders from FILE, one per line")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="batch mode: worker processes (default: CPU count)")
+    parser.add_argument("--report", metavar="FILE",
+                        help="batch mode: write per-project timings and errors as JSON")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="text",
+                        help="text: file contents (gzip/zstd: compressed), zip/tar: archive, "
+                             "jsonl: one record per file, list: paths only, structure: ASCII tree")
+    parser.add_argument("-i", "--include", action="append", default=[], metavar="GLOB",
+                        help="only keep files matching this glob (repeatable)")
+    parser.add_argument("-e", "--exclude", action="append", default=[], metavar="GLOB",
+                        help="drop files matching this glob (repeatable)")
+    parser.add_argument("-g", "--grep", metavar="REGEX",
+                        help="only keep files whose contents match REGEX")
+    parser.add_argument("--changed", nargs="?", const="HEAD", metavar="REF",
+                        help="only keep files changed against the git REF (default HEAD), "
+                             "including untracked ones")
+    parser.add_argument("--diff", action="store_true",
+                        help="export unified diffs against the --changed REF (or HEAD) "
+                             "instead of file contents")
+    parser.add_argument("--split", type=parse_size, metavar="SIZE",
+                        help="write the export as parts of at most SIZE (e.g. 2M) plus an index file")
+    parser.add_argument("--split-tokens", type=int, metavar="N",
+                        help="write the export as parts of at most N estimated tokens")
+    parser.add_argument("--max-file-size", type=parse_size, metavar="SIZE",
+                        help="leave out files larger than SIZE (e.g. 5M)")
+    parser.add_argument("--truncate", type=parse_size, metavar="SIZE",
+                        help="cut exported files off after SIZE")
+    parser.add_argument("--token-budget", type=int, metavar="N",
+                        help="only export files whose estimated tokens fit into N")
+    parser.add_argument("--priority", choices=PRIORITIES, default="order",
+                        help="with --token-budget: keep list order or prefer small files")
+    parser.add_argument("--depth", type=int, metavar="N",
+                        help="structure: only show N levels of folders")
+    parser.add_argument("--max-entries", type=int, metavar="N",
+                        help="structure: show at most N entries per folder")
+    parser.add_argument("--git-files", choices=GIT_MODES,
+                        help="read file names from the git index: tracked files only, "
+                             "or also untracked files that are not ignored")
+    parser.add_argument("--no-sniff", action="store_true",
+                        help="do not check file contents for binary data")
+    parser.add_argument("--index", action="store_true",
+                        help="use the persistent scan index for faster rescans")
+    parser.add_argument("--read-cache", action="store_true",
+                        help="reuse unchanged file contents from the on-disk read cache")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="write identical files once; later copies refer back to the first")
+    parser.add_argument("--near-duplicates", action="store_true",
+                        help="also write similar small files as diffs (implies --dedupe)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write stage timings and skip counters as JSON to FILE")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="write a cProfile capture of the run to FILE")
+    return parser
+
+def write_output(text: str, output: str):
+    if output == "-":
+        sys.stdout.write(text + "\n")
+    else:
+        Path(output).write_text(text + "\n", encoding="utf-8")
+
+def export_options(args) -> dict:
+    """Keyword arguments for api.export from the command line."""
+    return {
+        "max_file_bytes": args.truncate,
+        "fmt": args.format,
+        "dedupe": args.dedupe,
+        "near_duplicates": args.near_duplicates,
+        "diff_ref": (args.changed or "HEAD") if args.diff else None,
+        "split_limit": args.split or args.split_tokens,
+        "split_unit": "tokens" if args.split_tokens else "bytes",
+    }
+
+def run_batch(args, roots, options) -> int:
+    import json
+    from batch import export_batch
+
+    if args.format not in OUTPUT_FORMATS:
+        print(f"otter: batch mode does not support the {args.format} format", file=sys.stderr)
+        return 2
+
+    out_dir = Path(args.output or "otter_exports")
+
+    def report(result):
+        if result.error:
+            print(f"FAILED {result.root}: {result.error}", file=sys.stderr)
+        else:
+            skipped = f", {result.skipped} over the token budget" if result.skipped else ""
+            print(
+                f"ok     {result.root}: {result.files} files{skipped} "
+                f"(scan {result.scan_seconds:.2f}s, export {result.export_seconds:.2f}s)",
+                file=sys.stderr,
+            )
+
+    batch_options = {
+        "scan": options,
+        "export": export_options(args),
+        "grep": args.grep,
+        "token_budget": args.token_budget,
+        "priority": args.priority,
+        "read_cache": args.read_cache,
+    }
+    results = export_batch(
+        roots, out_dir, args.include, args.exclude, options=batch_options,
+        processes=args.jobs, on_result=report, suffix=OUTPUT_FORMATS[args.format],
+    )
+
+    if args.report:
+        Path(args.report).write_text(
+            json.dumps([r.as_dict() for r in results], indent=2), encoding="utf-8"
+        )
+
+    failed = sum(1 for r in results if r.error)
+    print(f"Exported {len(results) - failed} of {len(results)} projects to {out_dir}", file=sys.stderr)
+    return 1 if failed else 0
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    roots = [Path(r) for r in args.roots]
+    if args.manifest:
+        from batch import read_manifest
+        roots.extend(read_manifest(args.manifest))
+    if not roots:
+        parser.error("no project folder given")
+
+    options = {
+        "max_file_bytes": args.max_file_size,
+        "sniff": not args.no_sniff,
+        "use_index": args.index,
+        "git_files": args.git_files,
+        "changed_since": args.changed,
+    }
+    if args.changed is not None and args.git_files:
+        parser.error("--changed cannot be combined with --git-files")
+    if args.diff and args.format not in ("text", "gzip", "zstd", "list", "structure"):
+        parser.error(f"--diff cannot be written as {args.format}")
+    if args.split and args.split_tokens:
+        parser.error("--split and --split-tokens cannot be combined")
+    if args.split or args.split_tokens:
+        if args.format not in ("text", "gzip", "zstd"):
+            parser.error(f"{args.format} output cannot be split")
+        if args.diff:
+            parser.error("--diff exports cannot be split")
+
+    if args.grep:
+        try:
+            re.compile(args.grep)
+        except re.error as e:
+            parser.error(f"invalid --grep pattern: {e}")
+
+    if args.format in OUTPUT_FORMATS and not format_available(args.format):
+        print(f"otter: the {args.format} format is not available "
+              "(zstd needs Python 3.14+ or the zstandard package)", file=sys.stderr)
+        return 2
+
+    if len(roots) > 1 or args.manifest:
+        if args.trace or args.profile:
+            parser.error("--trace and --profile need a single project folder")
+        return run_batch(args, roots, options)
+
+    root = roots[0]
+    if not root.is_dir():
+        print(f"otter: not a folder: {root}", file=sys.stderr)
+        return 2
+    args.output = args.output or "-"
+    if args.output == "-" and args.format not in ("text", "jsonl", "list", "structure"):
+        print(f"otter: the {args.format} format needs an output file (-o)", file=sys.stderr)
+        return 2
+    if args.output == "-" and (args.split or args.split_tokens):
+        print("otter: split exports need an output file (-o)", file=sys.stderr)
+        return 2
+
+    # --trace always records; otherwise OTTER_TRACE decides
+    trace = Trace("cli") if args.trace else new_trace("cli")
+    options["trace"] = trace
+    with profiled(bool(args.profile), "cli", args.profile):
+        try:
+            code = run_single(args, root, options)
+        # git failed (e.g. an unknown --changed ref), or a file does not fit a --split part
+        except (RuntimeError, ValueError) as e:
+            print(f"otter: {e}", file=sys.stderr)
+            code = 2
+    try:
+        trace.write(args.trace)
+    except OSError as e:
+        print(f"otter: could not write trace: {e}", file=sys.stderr)
+    return code
+
+def run_single(args, root, options) -> int:
+    trace = options["trace"]
+    if args.format == "structure":
+        text = api.structure(root, args.depth, args.max_entries, **options)
+        write_output(text, args.output)
+        return 0
+
+    entries = api.scan(root, with_tokens=True, **options)
+    entries = api.filter_paths(entries, root, args.include, args.exclude)
+    if args.grep:
+        entries = api.grep(entries, args.grep)
+    if args.token_budget is not None:
+        total = len(entries)
+        entries = api.fit_token_budget(entries, args.token_budget, args.priority)
+        used = sum(tokens for _, tokens in entries)
+        print(
+            f"Token budget: {len(entries)} of {total} files fit "
+            f"(~{format_tokens(used)} of {format_tokens(args.token_budget)} tokens)",
+            file=sys.stderr,
+        )
+    files = [path for path, _ in entries]
+
+    if args.format == "list":
+        write_output("\n".join(api.relpath(p, root) for p in files), args.output)
+        return 0
+
+    cache = None
+    if args.read_cache:
+        from read_cache import ReadCache, get_cache_dir
+        cache = ReadCache(disk_dir=get_cache_dir())
+
+    export_args = export_options(args)
+    if args.split_tokens:
+        export_args["split_weights"] = [tokens for _, tokens in entries]
+    with trace.stage("export"):
+        result = api.export(files, args.output, cache=cache, root=root, **export_args)
+    trace.count("files_exported", result.files)
+    trace.count("bytes_read", result.bytes_read)
+    trace.count("files_truncated", result.truncated)
+    trace.count("files_failed", result.failed)
+    if cache is not None:
+        print(f"Read cache: {cache.summary()}", file=sys.stderr)
+    if result.duplicates:
+        print(f"Collapsed {result.duplicates} duplicate files", file=sys.stderr)
+    if result.parts:
+        print(
+            f"Exported {result.files} files in {len(result.parts) - 1} part(s) "
+            f"(index: {result.parts[-1]})",
+            file=sys.stderr,
+        )
+    elif args.output != "-":
+        print(f"Exported {result.files} files to {args.output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from sniffer import SNIFF_BYTES, bom_encoding, looks_like_text
+
+# --- Search settings --- #
+
+# Files per task handed to a worker process
+CHUNK_FILES = 256
+# Below this many files the search runs in the calling thread; starting
+# worker processes would take longer than the search itself
+PROCESS_MIN_FILES = 2000
+# Files at least this large are memory-mapped instead of read
+MMAP_MIN_BYTES = 64 * 1024
+
+def compile_pattern(pattern: str):
+    """
+    Compile a search regex for raw UTF-8 bytes and for decoded text
+    (files with a UTF-16/32 byte order mark). Raises re.error.
+    """
+    return re.compile(pattern.encode("utf-8")), re.compile(pattern)
+
+def file_matches(path, byte_regex, text_regex) -> bool:
+    """True if the text file at `path` contains a match; binaries never match."""
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            head = f.read(SNIFF_BYTES)
+            if not looks_like_text(head, complete=len(head) == size):
+                return False
+
+            encoding = bom_encoding(head)
+            if encoding and encoding != "utf-8-sig":
+                text = (head + f.read()).decode(encoding, errors="replace")
+                return text_regex.search(text) is not None
+
+            if size < MMAP_MIN_BYTES:
+                return byte_regex.search(head + f.read()) is not None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return byte_regex.search(data) is not None
+    except (OSError, ValueError):
+        return False
+
+def search_chunk(paths, pattern: str):
+    """Worker task: positions within `paths` of the files that match."""
+    byte_regex, text_regex = compile_pattern(pattern)
+    return [i for i, path in enumerate(paths) if file_matches(path, byte_regex, text_regex)]
+
+def search_files(paths, pattern: str, processes=None, cancel=None, on_matches=None):
+    """
+    Return the sorted indexes of the files in `paths` whose contents match
+    `pattern`. Large lists are split into chunks searched by a process
+    pool (regex matching holds the GIL, so threads would not help).
+    `on_matches(indexes)` receives each chunk's matches as it finishes.
+    Stops early once the optional cancel event is set.
+    """
+    compile_pattern(pattern)  # report a bad pattern before starting workers
+    paths = [os.fspath(p) for p in paths]
+    found = []
+
+    def report(start, positions):
+        indexes = [start + i for i in positions]
+        found.extend(indexes)
+        if indexes and on_matches is not None:
+            on_matches(indexes)
+
+    if len(paths) < PROCESS_MIN_FILES or processes == 1:
+        for start in range(0, len(paths), CHUNK_FILES):
+            if cancel is not None and cancel.is_set():
+                break
+            report(start, search_chunk(paths[start:start + CHUNK_FILES], pattern))
+        return sorted(found)
+
+    pool = ProcessPoolExecutor(max_workers=processes or os.cpu_count() or 1)
+    try:
+        pending = {
+            pool.submit(search_chunk, paths[start:start + CHUNK_FILES], pattern): start
+            for start in range(0, len(paths), CHUNK_FILES)
+        }
+        while pending:
+            if cancel is not None and cancel.is_set():
+                break
+            done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                report(pending.pop(future), future.result())
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return sorted(found)
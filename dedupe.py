@@ -0,0 +1,156 @@
+import difflib
+import hashlib
+import math
+from collections import deque
+
+# --- Duplicate detection settings --- #
+
+# Entries shorter than this are always written out; a back-reference
+# would not be shorter
+MIN_DEDUPE_CHARS = 64
+
+# Near-duplicate check: only entries up to this size take part, compared
+# against at most NEAR_CANDIDATES recent entries of similar size
+NEAR_MAX_CHARS = 64 * 1024
+NEAR_CANDIDATES = 16
+# Fraction of distinct lines two entries must share (Jaccard)
+NEAR_THRESHOLD = 0.8
+# Size buckets grow by this factor; neighbouring buckets are compared too
+NEAR_BUCKET_RATIO = 1.1
+# A diff is only used when it is at most this fraction of the entry
+NEAR_MAX_DIFF_RATIO = 0.5
+# Memory kept for near-duplicate candidates
+NEAR_MEMORY_CHARS = 32 * 1024 * 1024
+
+# First line of the closing list of duplicate files
+SUMMARY_HEADER = "[Duplicate files]"
+
+def _hasher():
+    """128-bit content hash: xxh3 when the optional xxhash package is installed."""
+    try:
+        import xxhash
+        return xxhash.xxh3_128()
+    except ImportError:
+        return hashlib.blake2b(digest_size=16)
+
+def _utf8_len(text: str) -> int:
+    return len(text.encode("utf-8", "surrogatepass"))
+
+def digest_text(text: str) -> bytes:
+    h = _hasher()
+    h.update(text.encode("utf-8", "surrogatepass"))
+    return h.digest()
+
+def digest_file(path, limit=None, chunk_size=1024 * 1024) -> bytes:
+    """Hash a file's raw bytes (up to `limit`) in chunks; None if unreadable."""
+    h = _hasher()
+    left = limit
+    try:
+        with open(path, "rb") as f:
+            while left is None or left > 0:
+                chunk = f.read(chunk_size if left is None else min(chunk_size, left))
+                if not chunk:
+                    break
+                h.update(chunk)
+                if left is not None:
+                    left -= len(chunk)
+    except OSError:
+        return None
+    return h.digest()
+
+class Deduplicator:
+    """
+    Remembers the content of exported entries so repeated files can be
+    written once. Exact duplicates are found by a 128-bit content hash;
+    with `near`, small entries are also compared by shared lines against
+    recent entries of similar size and written as a diff.
+    """
+
+    def __init__(self, near=False):
+        self.near = near
+        self._first = {}    # digest -> first path
+        self.groups = {}    # first path -> [duplicate paths]
+        self.duplicates = 0
+        self.near_duplicates = 0
+        self._buckets = {}  # size bucket -> deque of (path, text, line set)
+        self._near_chars = 0
+
+    def duplicate_of(self, path, digest):
+        """Return the first path with this digest, or record `path` as it."""
+        first = self._first.get(digest)
+        if first is None:
+            self._first[digest] = path
+            return None
+        self.groups.setdefault(first, []).append(path)
+        self.duplicates += 1
+        return first
+
+    def check_text(self, path, body: str):
+        """
+        Return a replacement for an entry body (back-reference or diff),
+        or None when the body should be written in full.
+        """
+        if len(body) < MIN_DEDUPE_CHARS:
+            return None
+        digest = digest_text(body)
+        first = self._first.get(digest)
+        if first is not None:
+            # A back-reference is never longer than the entry it replaces
+            reference = f"[Duplicate of {first}]\n\n"
+            if _utf8_len(reference) >= _utf8_len(body):
+                return None
+            self.duplicate_of(path, digest)
+            return reference
+        self._first[digest] = path
+        if self.near and len(body) <= NEAR_MAX_CHARS:
+            return self._check_near(path, body)
+        return None
+
+    # --- near duplicates --- #
+
+    def _check_near(self, path, body):
+        lines = body.splitlines()
+        line_set = set(lines)
+        bucket = round(math.log(len(body), NEAR_BUCKET_RATIO))
+
+        best, best_score = None, NEAR_THRESHOLD
+        for b in (bucket - 1, bucket, bucket + 1):
+            for candidate in self._buckets.get(b, ()):
+                other = candidate[2]
+                score = len(line_set & other) / len(line_set | other)
+                if score >= best_score:
+                    best, best_score = candidate, score
+
+        if best is not None:
+            diff = "\n".join(difflib.unified_diff(
+                best[1].splitlines(), lines, best[0], path, n=1, lineterm="",
+            ))
+            if len(diff) <= len(body) * NEAR_MAX_DIFF_RATIO:
+                replacement = (
+                    f"[Near-duplicate of {best[0]} ({best_score:.0%} of lines shared); "
+                    f"differences:]\n{diff}\n\n"
+                )
+                if _utf8_len(replacement) < _utf8_len(body):
+                    self.near_duplicates += 1
+                    self.groups.setdefault(best[0], []).append(path)
+                    return replacement
+
+        if self._near_chars + len(body) <= NEAR_MEMORY_CHARS:
+            entries = self._buckets.get(bucket)
+            if entries is None:
+                entries = self._buckets[bucket] = deque(maxlen=NEAR_CANDIDATES)
+            if len(entries) == entries.maxlen:
+                self._near_chars -= len(entries[0][1])
+            entries.append((path, body, line_set))
+            self._near_chars += len(body)
+        return None
+
+    def summary_text(self) -> str:
+        """A closing section listing every file that others refer back to."""
+        if not self.groups:
+            return ""
+        lines = [SUMMARY_HEADER]
+        for first, others in self.groups.items():
+            lines.append(f"{first}:")
+            lines.extend(f"  {other}" for other in others)
+        return "\n".join(lines) + "\n"
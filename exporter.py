@@ -0,0 +1,989 @@
+import codecs
+import io
+import itertools
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from gitignore import relpath
+from dedupe import SUMMARY_HEADER, Deduplicator, digest_file
+from read_cache import entry_key
+from sniffer import bom_encoding
+from tokens import estimate_from_size
+
+# --- Export settings --- #
+
+# Characters read per chunk; a file is never held in memory as a whole
+CHUNK_CHARS = 64 * 1024
+
+# Reader threads used to prefetch files while the writer emits them in order
+EXPORT_WORKERS = 8
+# Files up to this size are read ahead into memory by the reader threads;
+# larger ones are streamed by the writer when their turn comes
+PREFETCH_MAX_BYTES = 1024 * 1024
+# Prefetched entries allowed to wait for the writer, per worker
+PREFETCH_PER_WORKER = 4
+
+EMPTY_MARKER = "empty file."
+UNREADABLE_MARKER = "[Could not read file]"
+UNCHANGED_MARKER = "[No changes]"
+READ_ERROR_MARKER = "\n[Could not read rest of file]"
+
+def truncation_marker(shown: int, size: int) -> str:
+    return f"\n[Truncated: showing the first {shown} of {size} bytes]"
+
+# --- Output formats --- #
+
+# Format name -> default file suffix. "gzip" and "zstd" compress the text
+# format while it is written; "zip" and "tar" (gzip-compressed) store the
+# files under their relative paths; "jsonl" writes one record per file.
+OUTPUT_FORMATS = {
+    "text": ".txt",
+    "gzip": ".txt.gz",
+    "zstd": ".txt.zst",
+    "zip": ".zip",
+    "tar": ".tar.gz",
+    "jsonl": ".jsonl",
+}
+TEXT_FORMATS = ("text", "gzip", "zstd")
+COMPRESS_LEVEL = 6
+
+# Numbers the temporary files of exports running in this process
+_TEMP_IDS = itertools.count(1)
+
+def temp_path(path: Path) -> Path:
+    """
+    A unique temporary name next to `path` to write an export to before
+    it is moved into place, so concurrent or cancelled exports of the
+    same file never share one.
+    """
+    return path.with_name(f"{path.name}.{os.getpid()}-{next(_TEMP_IDS)}.part")
+
+def _zstd():
+    """The zstd module: stdlib on Python 3.14+, else the optional zstandard package."""
+    try:
+        from compression import zstd
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        raise RuntimeError("zstd output needs Python 3.14+ or the 'zstandard' package") from None
+
+def format_available(fmt: str) -> bool:
+    """True if `fmt` can be written with the installed modules."""
+    if fmt == "zstd":
+        try:
+            _zstd()
+        except RuntimeError:
+            return False
+    return fmt in OUTPUT_FORMATS
+
+def open_text_sink(path: Path, fmt: str = "text"):
+    """Open `path` for writing the text format, compressing on the fly."""
+    if fmt == "text":
+        return open(path, "w", encoding="utf-8")
+    if fmt == "gzip":
+        import gzip
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=COMPRESS_LEVEL)
+    if fmt == "zstd":
+        return _zstd().open(path, "wt", encoding="utf-8")
+    raise ValueError(f"not a text format: {fmt!r}")
+
+class ExportResult:
+    """Counters describing a finished (or cancelled) export."""
+
+    __slots__ = (
+        "files", "bytes_read", "truncated", "failed", "duplicates", "cancelled", "parts",
+    )
+
+    def __init__(self):
+        self.files = 0
+        self.bytes_read = 0
+        self.truncated = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.cancelled = False
+        # Files written by a split export (parts, then the index)
+        self.parts = []
+
+# --- Streaming copy --- #
+
+def copy_trimmed(src, out, cancel=None):
+    """
+    Copy text from `src` to `out` in chunks with leading and trailing
+    whitespace removed (like str.strip) without loading the whole file.
+    Returns (chars read, wrote anything).
+    """
+    started = False
+    pending = ""  # trailing whitespace held back until more text follows
+    read = 0
+
+    while True:
+        if cancel is not None and cancel.is_set():
+            break
+        chunk = src.read(CHUNK_CHARS)
+        if not chunk:
+            break
+        read += len(chunk)
+
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+
+        body = chunk.rstrip()
+        if body:
+            out.write(pending)
+            out.write(body)
+            pending = chunk[len(body):]
+        else:
+            pending += chunk
+
+    return read, started
+
+def text_decoder(encoding: str):
+    """
+    An incremental decoder for `encoding` that turns "\r\n" and "\r"
+    into "\n", like reading the file in text mode.
+    """
+    return io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(), translate=True)
+
+class _LimitedText:
+    """
+    Text reader that decodes at most `limit` bytes of the binary file
+    `raw` (all of it when None). A character cut by the limit is left
+    out; one cut by the end of the file is a decoding error.
+    """
+
+    def __init__(self, raw, encoding, limit=None):
+        self.raw = raw
+        self.left = limit
+        self.decoder = text_decoder(encoding)
+
+    def read(self, size):
+        while True:
+            n = size if self.left is None else min(size, self.left)
+            data = self.raw.read(n) if n > 0 else b""
+            if self.left is not None:
+                self.left -= len(data)
+            # A short read is the end of the file
+            at_end = len(data) < n or self.left == 0
+            text = self.decoder.decode(data, final=at_end and self.left != 0)
+            if text or at_end:
+                return text
+
+def write_file_entry(out, path: Path, max_file_bytes=None, cancel=None):
+    """
+    Write one "<path>:\n<content>\n\n" entry to `out`.
+    Returns (bytes read, truncated, failed).
+    """
+    out.write(f"{path}:\n")
+
+    try:
+        size = os.stat(path).st_size
+        raw = open(path, "rb")
+    except OSError:
+        out.write(f"{UNREADABLE_MARKER}\n\n")
+        return 0, False, True
+
+    # Honour a byte order mark (and drop it); plain UTF-8 otherwise
+    try:
+        encoding = bom_encoding(raw.read(4)) or "utf-8"
+        raw.seek(0)
+    except OSError:
+        raw.close()
+        out.write(f"{UNREADABLE_MARKER}\n\n")
+        return 0, False, True
+
+    limit = max_file_bytes if max_file_bytes and size > max_file_bytes else None
+    src = _LimitedText(raw, encoding, limit)
+
+    with raw:
+        # Decode the first chunk before writing anything, so binary files
+        # are reported as unreadable instead of half-written
+        try:
+            head = src.read(CHUNK_CHARS)
+        except (UnicodeDecodeError, OSError):
+            out.write(f"{UNREADABLE_MARKER}\n\n")
+            return 0, False, True
+
+        try:
+            _, wrote = copy_trimmed(_Prepend(head, src), out, cancel=cancel)
+        except (UnicodeDecodeError, OSError):
+            out.write(f"{READ_ERROR_MARKER}\n\n")
+            return size, False, True
+
+    truncated = limit is not None and not (cancel is not None and cancel.is_set())
+    if not wrote:
+        out.write(EMPTY_MARKER)
+    if truncated:
+        out.write(truncation_marker(limit, size))
+    out.write("\n\n")
+    return (limit if truncated else size), truncated, False
+
+class _Prepend:
+    """File-like reader that returns `head` before reading from `src`."""
+
+    def __init__(self, head: str, src):
+        self.head = head
+        self.src = src
+
+    def read(self, size):
+        if self.head:
+            chunk, self.head = self.head[:size], self.head[size:]
+            return chunk
+        return self.src.read(size)
+
+# --- Export --- #
+
+def render_entry(path: Path, max_file_bytes=None, cancel=None, cache=None):
+    """
+    Read a small file into a finished entry string on a reader thread.
+    Returns (text, bytes read, truncated, failed), or None when the file
+    is too large to prefetch and should be streamed by the writer.
+    With a ReadCache, unchanged files are served without being read.
+    """
+    try:
+        st = os.stat(path)
+        size = st.st_size
+    except OSError:
+        st, size = None, 0
+    if max_file_bytes:
+        size = min(size, max_file_bytes)
+    if size > PREFETCH_MAX_BYTES:
+        return None
+
+    key = None
+    if cache is not None and st is not None:
+        key = entry_key(path, st, max_file_bytes)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+
+    buf = io.StringIO()
+    stats = write_file_entry(buf, path, max_file_bytes, cancel)
+    entry = (buf.getvalue(),) + stats
+    # Failures may be transient (locked file, permissions), and a cancelled
+    # read leaves an incomplete entry: never cache them
+    if key is not None and not entry[3] and not (cancel is not None and cancel.is_set()):
+        cache.put(key, entry)
+    return entry
+
+def _prefetch(paths, func, workers):
+    """
+    Yield (path, func(path)) in the original order while up to `workers`
+    threads compute ahead. The read-ahead window is bounded, so at most
+    workers * PREFETCH_PER_WORKER results sit in memory.
+    """
+    if workers <= 1:
+        for path in paths:
+            yield path, func(path)
+        return
+
+    window = workers * PREFETCH_PER_WORKER
+    pending = deque()
+    it = iter(paths)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            while True:
+                while len(pending) < window:
+                    path = next(it, None)
+                    if path is None:
+                        break
+                    pending.append((path, pool.submit(func, path)))
+                if not pending:
+                    return
+                path, future = pending.popleft()
+                yield path, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+def _iter_entries(paths, max_file_bytes, cancel, workers, cache=None):
+    """
+    Yield (path, prefetched entry or None) in the original order; small
+    files are rendered ahead by reader threads (see _prefetch).
+    """
+    if workers <= 1 and cache is None:
+        return ((path, None) for path in paths)
+    return _prefetch(
+        paths, lambda path: render_entry(path, max_file_bytes, cancel, cache), workers
+    )
+
+def write_export(out, paths, max_file_bytes=None, progress=None, cancel=None,
+                 workers=EXPORT_WORKERS, cache=None, dedupe=None):
+    """
+    Stream the given files into the text stream `out`, in order. Small
+    files are prefetched by `workers` reader threads (or served from a
+    ReadCache); large files are streamed in chunks. With a Deduplicator,
+    repeated files are written once and later copies refer back to them.
+    `progress(done, total)` is called after each file.
+    """
+    result = ExportResult()
+    total = len(paths)
+
+    if dedupe is None:
+        entries = _iter_entries(paths, max_file_bytes, cancel, workers, cache)
+    else:
+        def prepare(path):
+            # Large files are hashed by the reader threads instead
+            entry = render_entry(path, max_file_bytes, cancel, cache)
+            return entry if entry is not None else digest_file(path, max_file_bytes)
+        entries = _prefetch(paths, prepare, workers)
+
+    for done, (path, entry) in enumerate(entries, 1):
+        if cancel is not None and cancel.is_set():
+            entries.close()
+            break
+
+        if entry is None or isinstance(entry, bytes):
+            first = None
+            if entry is not None:
+                first = dedupe.duplicate_of(str(path), entry)
+            if first is None:
+                read, truncated, failed = write_file_entry(
+                    out, path, max_file_bytes, cancel
+                )
+            else:
+                out.write(f"{path}:\n[Duplicate of {first}]\n\n")
+                read, truncated, failed = 0, False, False
+                result.duplicates += 1
+        else:
+            text, read, truncated, failed = entry
+            if dedupe is not None and not failed:
+                header = f"{path}:\n"
+                replacement = dedupe.check_text(str(path), text[len(header):])
+                if replacement is not None:
+                    text = header + replacement
+                    result.duplicates += 1
+            out.write(text)
+        result.files += 1
+        result.bytes_read += read
+        result.truncated += truncated
+        result.failed += failed
+
+        if progress is not None:
+            progress(done, total)
+
+    if cancel is not None and cancel.is_set():
+        result.cancelled = True
+    elif dedupe is not None:
+        out.write(dedupe.summary_text())
+    return result
+
+def write_diffs(out, paths, diff, max_file_bytes=None, progress=None, cancel=None,
+                workers=EXPORT_WORKERS):
+    """
+    Write a "<path>:\n<unified diff>\n\n" entry per file instead of its
+    contents. `diff(path)` returns the diff text (see git_changes.ChangeDiffs)
+    and runs ahead on `workers` threads; diffs are cut off after
+    `max_file_bytes` characters.
+    """
+    result = ExportResult()
+    total = len(paths)
+
+    def render(path):
+        try:
+            return diff(path)
+        except (OSError, RuntimeError):
+            return None
+
+    entries = _prefetch(paths, render, workers)
+    for done, (path, text) in enumerate(entries, 1):
+        if cancel is not None and cancel.is_set():
+            entries.close()
+            result.cancelled = True
+            break
+
+        out.write(f"{path}:\n")
+        if text is None:
+            out.write(f"{UNREADABLE_MARKER}\n\n")
+            result.failed += 1
+        else:
+            text = text.strip()
+            size = len(text)
+            if max_file_bytes and size > max_file_bytes:
+                text = text[:max_file_bytes]
+                text += f"\n[Truncated: showing the first {max_file_bytes} of {size} characters]"
+                result.truncated += 1
+            out.write(f"{text or UNCHANGED_MARKER}\n\n")
+            result.bytes_read += size
+        result.files += 1
+
+        if progress is not None:
+            progress(done, total)
+    return result
+
+# --- Per-file formats --- #
+
+def archive_names(paths, root=None):
+    """
+    Relative posix names for archive members and JSONL records: relative
+    to `root`, or to the deepest folder containing all paths.
+    """
+    if root is None:
+        dirs = [os.path.dirname(os.path.abspath(p)) for p in paths]
+        root = os.path.commonpath(dirs) if dirs else ""
+    return [relpath(os.path.abspath(p), root) for p in paths]
+
+def _read_limited(path: Path, max_file_bytes=None):
+    """Return (bytes, file size, truncated), reading at most `max_file_bytes`."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        truncated = bool(max_file_bytes) and size > max_file_bytes
+        data = f.read(max_file_bytes if truncated else -1)
+    return data, size, truncated
+
+def _error_record(name: str) -> str:
+    record = {"path": name, "size": 0, "content": None, "truncated": False,
+              "error": UNREADABLE_MARKER}
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+def render_record(path: Path, name: str, max_file_bytes=None):
+    """
+    One JSONL line for a file: path, size, content and truncation flag.
+    Returns (line, bytes read, truncated, failed), or None when the file
+    is too large to prefetch and should be streamed by write_record.
+    """
+    try:
+        size = os.stat(path).st_size
+    except OSError:
+        size = 0
+    if max_file_bytes:
+        size = min(size, max_file_bytes)
+    if size > PREFETCH_MAX_BYTES:
+        return None
+
+    record = {"path": name, "size": 0, "content": None, "truncated": False}
+    try:
+        data, size, truncated = _read_limited(path, max_file_bytes)
+        encoding = bom_encoding(data[:4]) or "utf-8"
+        # A truncated file may end inside a character: leave it out
+        content = text_decoder(encoding).decode(data, final=not truncated)
+    except (OSError, UnicodeDecodeError):
+        return _error_record(name), 0, False, True
+
+    record.update(size=size, content=content, truncated=truncated)
+    return json.dumps(record, ensure_ascii=False) + "\n", len(data), truncated, False
+
+def write_record(out, path: Path, name: str, max_file_bytes=None, cancel=None):
+    """
+    Stream the JSONL line of a large file to `out`, escaping its content
+    chunk by chunk. A file that fails to decode part way keeps the
+    content written so far and gets an "error" field. Returns (bytes
+    read, truncated, failed) like write_file_entry.
+    """
+    try:
+        raw = open(path, "rb")
+    except OSError:
+        out.write(_error_record(name))
+        return 0, False, True
+
+    with raw:
+        try:
+            size = os.fstat(raw.fileno()).st_size
+            encoding = bom_encoding(raw.read(4)) or "utf-8"
+            raw.seek(0)
+            limit = max_file_bytes if max_file_bytes and size > max_file_bytes else None
+            src = _LimitedText(raw, encoding, limit)
+            # Decode the first chunk first, so binary files get no content
+            chunk = src.read(CHUNK_CHARS)
+        except (OSError, UnicodeDecodeError):
+            out.write(_error_record(name))
+            return 0, False, True
+
+        out.write(f'{{"path": {json.dumps(name, ensure_ascii=False)}, "size": {size}, "content": "')
+        failed = False
+        try:
+            while chunk and not (cancel is not None and cancel.is_set()):
+                out.write(json.dumps(chunk, ensure_ascii=False)[1:-1])
+                chunk = src.read(CHUNK_CHARS)
+        except (OSError, UnicodeDecodeError):
+            failed = True
+
+    truncated = limit is not None and not failed
+    out.write(f'", "truncated": {json.dumps(truncated)}')
+    if failed:
+        out.write(f', "error": {json.dumps(READ_ERROR_MARKER.strip())}')
+    out.write("}\n")
+    return (limit if truncated else size), truncated, failed
+
+def write_jsonl(out, paths, root=None, max_file_bytes=None, progress=None, cancel=None,
+                workers=EXPORT_WORKERS):
+    """
+    Write one JSON record per file to the text stream `out`, in order.
+    Small files are rendered ahead by `workers` reader threads; large
+    ones are streamed by the writer (see write_record).
+    """
+    result = ExportResult()
+    total = len(paths)
+    names = archive_names(paths, root)
+
+    records = _prefetch(
+        range(total), lambda i: render_record(paths[i], names[i], max_file_bytes), workers
+    )
+    for done, (i, record) in enumerate(records, 1):
+        if cancel is not None and cancel.is_set():
+            records.close()
+            break
+        if record is None:
+            read, truncated, failed = write_record(
+                out, paths[i], names[i], max_file_bytes, cancel
+            )
+        else:
+            line, read, truncated, failed = record
+            out.write(line)
+        result.files += 1
+        result.bytes_read += read
+        result.truncated += truncated
+        result.failed += failed
+        if progress is not None:
+            progress(done, total)
+
+    if cancel is not None and cancel.is_set():
+        result.cancelled = True
+    return result
+
+class _FixedReader:
+    """Reads exactly `size` bytes from `src`, padding with NULs if it shrank."""
+
+    def __init__(self, src, size):
+        self.src = src
+        self.left = size
+
+    def read(self, n=-1):
+        if n < 0 or n > self.left:
+            n = self.left
+        data = self.src.read(n)
+        if len(data) < n:
+            data += bytes(n - len(data))
+        self.left -= n
+        return data
+
+def write_archive(out_path: Path, fmt, paths, root=None, max_file_bytes=None,
+                  progress=None, cancel=None):
+    """
+    Store the files in a zip or gzip-compressed tar archive under their
+    relative paths, streaming each file into the archive in chunks.
+    Files larger than `max_file_bytes` are stored cut off.
+    """
+    # Imported here: they add noticeably to the command line's start time
+    import tarfile
+    import zipfile
+
+    result = ExportResult()
+    total = len(paths)
+    names = archive_names(paths, root)
+
+    if fmt == "zip":
+        archive = zipfile.ZipFile(
+            out_path, "w", zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL
+        )
+    elif fmt == "tar":
+        archive = tarfile.open(out_path, "w:gz", compresslevel=COMPRESS_LEVEL)
+    else:
+        raise ValueError(f"not an archive format: {fmt!r}")
+
+    with archive:
+        for done, (path, name) in enumerate(zip(paths, names), 1):
+            if cancel is not None and cancel.is_set():
+                result.cancelled = True
+                break
+            result.files += 1
+            try:
+                src = open(path, "rb")
+            except OSError:
+                src = None
+                result.failed += 1
+
+            if src is not None:
+                with src:
+                    st = os.fstat(src.fileno())
+                    size = st.st_size
+                    if max_file_bytes and size > max_file_bytes:
+                        size = max_file_bytes
+                        result.truncated += 1
+                    if fmt == "zip":
+                        info = zipfile.ZipInfo.from_file(path, name)
+                        info.compress_type = zipfile.ZIP_DEFLATED
+                        with archive.open(info, "w", force_zip64=True) as dst:
+                            reader = _FixedReader(src, size)
+                            while reader.left:
+                                dst.write(reader.read(CHUNK_CHARS))
+                    else:
+                        info = tarfile.TarInfo(name)
+                        info.size = size
+                        info.mtime = int(st.st_mtime)
+                        info.mode = st.st_mode & 0o777
+                        archive.addfile(info, _FixedReader(src, size))
+                result.bytes_read += size
+
+            if progress is not None:
+                progress(done, total)
+
+    return result
+
+def export_files(paths, out_path: Path, max_file_bytes=None, progress=None, cancel=None,
+                 workers=EXPORT_WORKERS, cache=None, fmt="text", root=None, dedupe=None,
+                 diff=None):
+    """
+    Export the given files into `out_path` in one of OUTPUT_FORMATS
+    (the text formats are described in write_export and may collapse
+    duplicates with `dedupe`, or hold diffs from `diff` instead of file
+    contents; archives and JSONL name files relative to `root`). The
+    output is written to a temporary
+    file first and only moved into place when complete, so a cancelled
+    export leaves no partial file behind.
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"unknown output format: {fmt!r}")
+    if diff is not None and fmt not in TEXT_FORMATS:
+        raise ValueError(f"diffs cannot be exported as {fmt}")
+    out_path = Path(out_path)
+    tmp_path = temp_path(out_path)
+
+    try:
+        if diff is not None:
+            with open_text_sink(tmp_path, fmt) as out:
+                result = write_diffs(
+                    out, paths, diff, max_file_bytes, progress, cancel, workers
+                )
+        elif fmt in TEXT_FORMATS:
+            with open_text_sink(tmp_path, fmt) as out:
+                result = write_export(
+                    out, paths, max_file_bytes, progress, cancel, workers, cache, dedupe
+                )
+        elif fmt == "jsonl":
+            with open(tmp_path, "w", encoding="utf-8", newline="\n") as out:
+                result = write_jsonl(
+                    out, paths, root, max_file_bytes, progress, cancel, workers
+                )
+        else:
+            result = write_archive(
+                tmp_path, fmt, paths, root, max_file_bytes, progress, cancel
+            )
+
+        if result.cancelled:
+            tmp_path.unlink()
+        else:
+            os.replace(tmp_path, out_path)
+    except BaseException:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+
+    return result
+
+# --- Split exports --- #
+
+# A split limit counts either bytes of the written part or estimated tokens
+SPLIT_UNITS = ("bytes", "tokens")
+# Parts written at the same time; the reader threads are shared out among them
+PART_WORKERS = 4
+# Bytes read at a time while looking back for the last newline before a cut
+PIECE_LINE_SEARCH = 4096
+# Room kept in every entry for a marker standing in for or following its content
+MARKER_RESERVE = max(len(EMPTY_MARKER), len(UNREADABLE_MARKER), len(READ_ERROR_MARKER))
+
+def _utf8_len(text: str) -> int:
+    return len(text.encode("utf-8", "replace"))
+
+def split_names(out_path: Path, count: int, fmt="text"):
+    """(part file paths, index file path) for a split export of `out_path`."""
+    out_path = Path(out_path)
+    suffix = OUTPUT_FORMATS[fmt]
+    base = out_path.name
+    if base.endswith(suffix) and len(base) > len(suffix):
+        base = base[:-len(suffix)]
+    parts = [out_path.with_name(f"{base}.part{n:03d}{suffix}") for n in range(1, count + 1)]
+    return parts, out_path.with_name(f"{base}.index.txt")
+
+def plan_parts(weights, limit, split=None, reserve=0):
+    """
+    Pack entries into parts of at most `limit` total weight, in order,
+    each part also holding `reserve`. An entry that does not fit a part
+    on its own gets parts of its own: one per piece `split(index)` cuts
+    it into, or a single one when `split` is None or returns None.
+    Returns a list of parts, each a list of (index, piece, pieces).
+    """
+    parts, current, used = [], [], reserve
+    for i, weight in enumerate(weights):
+        if weight + reserve > limit:
+            if current:
+                parts.append(current)
+                current, used = [], reserve
+            ranges = split(i) if split is not None else None
+            pieces = len(ranges) if ranges else 1
+            parts.extend([(i, piece, pieces)] for piece in range(pieces))
+            continue
+        if current and used + weight > limit:
+            parts.append(current)
+            current, used = [], reserve
+        current.append((i, 0, 1))
+        used += weight
+    if current:
+        parts.append(current)
+    return parts
+
+def _char_start(f, start: int, end: int) -> int:
+    """`end` moved back (but not to `start`) onto the start of a UTF-8 character."""
+    low = max(start + 1, end - 3)
+    f.seek(low)
+    data = f.read(end + 1 - low)
+    cut = end
+    while cut > low and cut - low < len(data) and 0x80 <= data[cut - low] < 0xC0:
+        cut -= 1
+    return cut
+
+def _line_cut(f, start: int, end: int) -> int:
+    """
+    A cut position in (start, end]: after the last newline before `end`,
+    or on a UTF-8 character start when the range holds no newline.
+    """
+    pos = end
+    while pos > start:
+        block = max(start, pos - PIECE_LINE_SEARCH)
+        f.seek(block)
+        newline = f.read(pos - block).rfind(b"\n")
+        if newline >= 0:
+            return block + newline + 1
+        pos = block
+    cut = _char_start(f, start, end)
+    # Keep a "\r\n" line break in one piece
+    f.seek(cut - 1)
+    if cut - 1 > start and f.read(1) == b"\r":
+        cut -= 1
+    return cut
+
+def piece_ranges(f, total: int, capacity: int):
+    """
+    Cut the first `total` bytes of the binary file `f` into consecutive
+    (start, end) ranges of at most `capacity` bytes, each ending after a
+    newline where the range holds one. Returns the list of ranges.
+    """
+    ranges, start = [], 0
+    while start + capacity < total:
+        cut = _line_cut(f, start, start + capacity)
+        ranges.append((start, cut))
+        start = cut
+    ranges.append((start, total))
+    return ranges
+
+def write_file_piece(out, path: Path, piece: int, pieces: int, start: int, end: int,
+                     max_file_bytes=None):
+    """
+    Write one "<path> (part i of n):\n<content>\n\n" entry holding bytes
+    `start` to `end` of a UTF-8 file, as planned by split_export.
+    Returns (bytes read, truncated, failed) like write_file_entry.
+    """
+    out.write(f"{path} (part {piece + 1} of {pieces}):\n")
+    last = piece == pieces - 1
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            f.seek(start)
+            data = f.read(max(0, end - start))
+        text = text_decoder("utf-8-sig" if start == 0 else "utf-8").decode(data, final=True)
+    except (OSError, UnicodeDecodeError):
+        out.write(f"{UNREADABLE_MARKER}\n\n")
+        return 0, False, True
+
+    if piece == 0:
+        text = text.lstrip()
+    if last:
+        text = text.rstrip()
+    out.write(text)
+    truncated = last and bool(max_file_bytes) and size > max_file_bytes
+    if truncated:
+        out.write(truncation_marker(end, size))
+    out.write("\n\n")
+    return len(data), truncated, False
+
+def _file_info(path):
+    """(size, byte order mark encoding or None) of a file; (0, None) if unreadable."""
+    try:
+        with open(path, "rb") as f:
+            return os.fstat(f.fileno()).st_size, bom_encoding(f.read(4))
+    except OSError:
+        return 0, None
+
+def split_export(paths, out_path: Path, limit: int, unit="bytes", weights=None,
+                 max_file_bytes=None, progress=None, cancel=None, workers=EXPORT_WORKERS,
+                 cache=None, fmt="text", root=None, dedupe=None):
+    """
+    Export the given files in a text format as several parts of at most
+    `limit` bytes or estimated tokens each (`unit`), plus an index file
+    listing which files went into which part. Entry headers, markers and
+    each part's duplicate summary count towards the limit; in bytes, a
+    part never exceeds it except for a UTF-16/32 file too large for a
+    part, which is kept whole. Other files stay whole unless one alone
+    exceeds the limit; it is then cut after the last newline that fits
+    (or mid-line when a line does not fit). `weights` may supply each
+    file's size in `unit` (e.g. token estimates from the scan); otherwise
+    they are taken from the files. Parts are written concurrently, and
+    duplicates (with `dedupe`) are collapsed within each part. All parts
+    appear only once every part is complete. Returns one ExportResult
+    covering all parts, with the part files in `parts`.
+    """
+    if fmt not in TEXT_FORMATS:
+        raise ValueError(f"{fmt} exports cannot be split")
+    if unit not in SPLIT_UNITS:
+        raise ValueError(f"unknown split unit: {unit!r}")
+    if limit <= 0:
+        raise ValueError("the split limit must be positive")
+    paths = list(paths)
+
+    def in_unit(size):
+        return size if unit == "bytes" else estimate_from_size(size)
+
+    # Each entry's weight is an upper bound on what it writes: its header,
+    # its content (UTF-16 grows by up to half in UTF-8), a marker and its
+    # line in the duplicate summary
+    entry_weights = []
+    for i, path in enumerate(paths):
+        size, encoding = _file_info(path) if weights is None or unit == "bytes" else (0, None)
+        total = min(size, max_file_bytes) if max_file_bytes else size
+        if weights is not None:
+            content = weights[i]
+        else:
+            content = in_unit(total * 3 // 2 if encoding == "utf-16" else total)
+        overhead = _utf8_len(f"{path}:\n") + MARKER_RESERVE + 2
+        if total < size:
+            overhead += len(truncation_marker(total, size))
+        if dedupe is not None:
+            overhead += _utf8_len(str(path)) + 3
+        entry_weights.append(content + in_unit(overhead))
+    reserve = in_unit(len(SUMMARY_HEADER) + 1) if dedupe is not None else 0
+
+    ranges = {}
+
+    def split(i):
+        path = paths[i]
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return None
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            # Only UTF-8 files are cut into pieces; UTF-16/32 ones stay whole
+            if bom_encoding(f.read(4)) not in (None, "utf-8-sig"):
+                return None
+            total = min(size, max_file_bytes) if max_file_bytes else size
+            marker = 0
+            if total < size:
+                total = _char_start(f, 0, total) if total else 0
+                marker = len(truncation_marker(total, size))
+            # A token limit is turned into bytes by the file's bytes per token
+            budget = limit if unit == "bytes" else total * limit // max(1, entry_weights[i])
+            digits = 1
+            while True:
+                number = "9" * digits
+                header = _utf8_len(f"{path} (part {number} of {number}):\n")
+                capacity = budget - header - 2 - marker
+                if capacity < len(UNREADABLE_MARKER):
+                    raise ValueError(f"the split limit is too small to hold {path}")
+                cuts = piece_ranges(f, total, capacity)
+                if len(str(len(cuts))) <= digits:
+                    ranges[i] = cuts
+                    return cuts
+                digits += 1
+
+    plan = plan_parts(entry_weights, limit, split, reserve)
+    part_names, index_path = split_names(out_path, len(plan), fmt)
+    tmp_paths = [temp_path(p) for p in part_names + [index_path]]
+
+    total = sum(len(part) for part in plan)
+    done = 0
+    lock = threading.Lock()
+
+    def tick(n):
+        nonlocal done
+        with lock:
+            done += n
+            if progress is not None:
+                progress(done, total)
+
+    part_workers = max(1, workers // PART_WORKERS)
+
+    def write_part(k):
+        entries = plan[k]
+        with open_text_sink(tmp_paths[k], fmt) as out:
+            i, piece, pieces = entries[0]
+            if i in ranges:
+                result = ExportResult()
+                if cancel is not None and cancel.is_set():
+                    result.cancelled = True
+                    return result
+                read, truncated, failed = write_file_piece(
+                    out, paths[i], piece, pieces, *ranges[i][piece], max_file_bytes
+                )
+                result.files = int(piece == 0)
+                result.bytes_read, result.truncated, result.failed = read, truncated, failed
+                tick(1)
+                return result
+
+            last = 0
+
+            def part_progress(part_done, _):
+                nonlocal last
+                tick(part_done - last)
+                last = part_done
+
+            return write_export(
+                out, [paths[i] for i, _, _ in entries], max_file_bytes, part_progress,
+                cancel, part_workers, cache,
+                Deduplicator(near=dedupe.near) if dedupe is not None else None,
+            )
+
+    result = ExportResult()
+    try:
+        with ThreadPoolExecutor(max_workers=min(PART_WORKERS, len(plan)) or 1) as pool:
+            for part in pool.map(write_part, range(len(plan))):
+                result.files += part.files
+                result.bytes_read += part.bytes_read
+                result.truncated += part.truncated
+                result.failed += part.failed
+                result.duplicates += part.duplicates
+                result.cancelled = result.cancelled or part.cancelled
+
+        if result.cancelled or (cancel is not None and cancel.is_set()):
+            result.cancelled = True
+            for tmp in tmp_paths:
+                try:
+                    tmp.unlink()
+                except OSError:
+                    pass
+            return result
+
+        with open(tmp_paths[-1], "w", encoding="utf-8") as out:
+            out.write(f"# {len(plan)} part(s) of at most {limit} {unit} each\n")
+            for name, entries in zip(part_names, plan):
+                out.write(f"\n{name.name}:\n")
+                for i, piece, pieces in entries:
+                    path = paths[i]
+                    line = relpath(path, root) if root is not None else str(path)
+                    if i in ranges:
+                        line += f" (part {piece + 1} of {pieces})"
+                    out.write(line + "\n")
+
+        for tmp, final in zip(tmp_paths, part_names + [index_path]):
+            os.replace(tmp, final)
+    except BaseException:
+        for tmp in tmp_paths:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+        raise
+
+    result.parts = part_names + [index_path]
+    return result
@@ -0,0 +1,97 @@
+import os
+from array import array
+from pathlib import Path
+
+# --- Compact file list --- #
+
+class FileTable:
+    """
+    The scanned files under one root, stored column-wise. A row holds the
+    ids of its interned directory prefix and basename, plus estimated
+    tokens, size and mtime in arrays, so a row costs a few dozen bytes
+    instead of a Path object. Paths and path strings are built only when
+    asked for (rows on screen, files being exported).
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._root_str = str(self.root)
+        # Interned relative directories ("" for the root) and basenames
+        self.dirs = []
+        self.names = []
+        self._dir_ids = {}
+        self._name_ids = {}
+        # One entry per row
+        self.dir_ids = array("I")
+        self.name_ids = array("I")
+        self.tokens = array("Q")
+        self.sizes = array("Q")
+        self.mtimes = array("q")
+
+    def __len__(self):
+        return len(self.name_ids)
+
+    def _dir_id(self, rel_dir: str) -> int:
+        i = self._dir_ids.get(rel_dir)
+        if i is None:
+            i = self._dir_ids[rel_dir] = len(self.dirs)
+            self.dirs.append(rel_dir)
+        return i
+
+    def _name_id(self, name: str) -> int:
+        i = self._name_ids.get(name)
+        if i is None:
+            i = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    def add(self, rel_dir: str, name: str, tokens=0, size=0, mtime_ns=0):
+        """Append a row for file `name` in the posix relative dir `rel_dir`."""
+        self.dir_ids.append(self._dir_id(rel_dir))
+        self.name_ids.append(self._name_id(name))
+        self.tokens.append(tokens)
+        self.sizes.append(size)
+        self.mtimes.append(mtime_ns)
+
+    def extend(self, other: "FileTable"):
+        """Append the rows of another table (e.g. a scan batch) over the same root."""
+        dir_map = [self._dir_id(d) for d in other.dirs]
+        name_map = [self._name_id(n) for n in other.names]
+        self.dir_ids.extend(dir_map[i] for i in other.dir_ids)
+        self.name_ids.extend(name_map[i] for i in other.name_ids)
+        self.tokens.extend(other.tokens)
+        self.sizes.extend(other.sizes)
+        self.mtimes.extend(other.mtimes)
+
+    # --- on-demand views --- #
+
+    def rel(self, i: int) -> str:
+        """Posix path of row `i` relative to the root."""
+        rel_dir = self.dirs[self.dir_ids[i]]
+        name = self.names[self.name_ids[i]]
+        return f"{rel_dir}/{name}" if rel_dir else name
+
+    def rels(self, indexes=None):
+        """Relative posix paths of the given rows (all rows by default)."""
+        if indexes is None:
+            indexes = range(len(self))
+        return [self.rel(i) for i in indexes]
+
+    def path(self, i: int) -> Path:
+        return self.root / self.rel(i)
+
+    def paths(self, indexes=None):
+        """Path objects for the given rows (all rows by default)."""
+        return [self.root / rel for rel in self.rels(indexes)]
+
+    def path_strings(self, indexes=None):
+        """Native path strings for the given rows, cheaper than paths()."""
+        prefix = os.path.join(self._root_str, "")
+        rels = self.rels(indexes)
+        if os.sep != "/":
+            rels = [rel.replace("/", os.sep) for rel in rels]
+        return [prefix + rel for rel in rels]
+
+    def row_index(self):
+        """Map of relative posix path -> row, for matching rows across rescans."""
+        return {rel: i for i, rel in enumerate(self.rels())}
@@ -0,0 +1,73 @@
+import subprocess
+from pathlib import Path
+from gitignore import relpath
+
+# --- Changes against a git ref --- #
+
+# Status letter used for untracked files (git diff uses M, A, D, T, ...)
+UNTRACKED = "?"
+# Seconds a single git command may take
+GIT_TIMEOUT = 120
+
+def run_git(root: Path, *args, ok=(0,)) -> bytes:
+    """Run the local git binary in `root`; raise RuntimeError on failure."""
+    try:
+        proc = subprocess.run(
+            ["git", "-C", str(root), *args],
+            stdin=subprocess.DEVNULL, capture_output=True, timeout=GIT_TIMEOUT,
+        )
+    except FileNotFoundError:
+        raise RuntimeError("git is not installed or not on PATH") from None
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"git {args[0]} took longer than {GIT_TIMEOUT} s") from None
+    if proc.returncode not in ok:
+        message = proc.stderr.decode("utf-8", "replace").strip()
+        raise RuntimeError(message or f"git {args[0]} failed")
+    return proc.stdout
+
+def _split_z(data: bytes):
+    return [item.decode("utf-8", "surrogateescape") for item in data.split(b"\0") if item]
+
+def changed_files(root: Path, ref: str = "HEAD", untracked=True):
+    """
+    Return {path relative to `root`: status letter} for the files that
+    differ between `ref` and the working tree (staged or not), plus
+    untracked, non-ignored files as UNTRACKED. Deleted files are listed
+    with status "D". Raises RuntimeError if git fails (not a repository,
+    unknown ref).
+    """
+    if ref.startswith("-"):
+        raise RuntimeError(f"invalid ref: {ref!r}")
+    # -z output alternates status and path; renames are split into D + A
+    items = _split_z(run_git(
+        root, "diff", "--name-status", "-z", "--no-renames", "--relative", ref, "--",
+    ))
+    changes = dict(zip(items[1::2], (status[:1] for status in items[0::2])))
+    if untracked:
+        for path in _split_z(run_git(root, "ls-files", "--others", "--exclude-standard", "-z")):
+            changes[path] = UNTRACKED
+    return changes
+
+class ChangeDiffs:
+    """
+    Callable turning a file path into its unified diff against `ref`
+    (untracked files diff against an empty file). Safe to call from
+    several reader threads at once.
+    """
+
+    def __init__(self, root: Path, ref: str = "HEAD", changes=None):
+        self.root = Path(root)
+        self.ref = ref
+        self.changes = changed_files(root, ref) if changes is None else changes
+
+    def __call__(self, path) -> str:
+        rel = relpath(path, self.root)
+        status = self.changes.get(rel)
+        if status is None:
+            return ""
+        if status == UNTRACKED:
+            # --no-index exits with 1 when the files differ
+            data = run_git(self.root, "diff", "--no-index", "--", "/dev/null", rel, ok=(0, 1))
+        else:
+            data = run_git(self.root, "diff", "--relative", self.ref, "--", rel)
+        return data.decode("utf-8", "replace")
@@ -0,0 +1,170 @@
+import os
+import struct
+from pathlib import Path
+from gitignore import relpath
+
+# --- Git index reader --- #
+
+# Index entry layout (see gitformat-index(5)): ten 32-bit stat fields,
+# the object id, then 16 bits of flags
+STAT_BYTES = 40
+FLAG_EXTENDED = 0x4000
+FLAG_SKIP_WORKTREE = 0x4000  # in the second (extended) flags word
+MODE_TYPE_MASK = 0o170000
+MODE_GITLINK = 0o160000      # submodule
+MODE_DIRECTORY = 0o040000    # sparse-index directory entry
+
+_U16 = struct.Struct(">H")
+_U32 = struct.Struct(">I")
+
+def find_repo(root: Path):
+    """
+    Return (work tree top, git dir) for the repository containing `root`,
+    or None. A `.git` file (worktrees, submodules) is followed to the
+    directory it points to.
+    """
+    root = Path(root).resolve()
+    for top in (root, *root.parents):
+        dot_git = top / ".git"
+        if dot_git.is_dir():
+            return top, dot_git
+        if dot_git.is_file():
+            try:
+                line = dot_git.read_text(encoding="utf-8").strip()
+            except (OSError, UnicodeDecodeError):
+                return None
+            if not line.startswith("gitdir:"):
+                return None
+            return top, (top / line[len("gitdir:"):].strip()).resolve()
+    return None
+
+def _hash_size(git_dir: Path) -> int:
+    """Object id length: 32 bytes in SHA-256 repositories, otherwise 20."""
+    try:
+        config = (git_dir / "config").read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return 20
+    for line in config.splitlines():
+        key, _, value = line.partition("=")
+        if key.strip().lower() == "objectformat" and value.strip().lower() == "sha256":
+            return 32
+    return 20
+
+def _varint(data, pos):
+    """Git's offset varint (used by index v4 path compression)."""
+    c = data[pos]
+    pos += 1
+    value = c & 0x7F
+    while c & 0x80:
+        c = data[pos]
+        pos += 1
+        value = ((value + 1) << 7) | (c & 0x7F)
+    return value, pos
+
+def read_index(git_dir: Path):
+    """
+    Return the paths (posix strings relative to the work tree, in index
+    order) of the files recorded in `git_dir`'s index. Submodules,
+    sparse-index directories and skip-worktree entries are left out, and
+    conflicted paths appear once. Raises OSError if the index cannot be
+    read and ValueError for formats this reader does not handle.
+    """
+    git_dir = Path(git_dir)
+    with open(git_dir / "index", "rb") as f:
+        data = f.read()
+    hash_size = _hash_size(git_dir)
+
+    if len(data) < 12 or data[:4] != b"DIRC":
+        raise ValueError("not a git index file")
+    version = _U32.unpack_from(data, 4)[0]
+    count = _U32.unpack_from(data, 8)[0]
+    if version not in (2, 3, 4):
+        raise ValueError(f"unsupported git index version {version}")
+
+    flags_at = STAT_BYTES + hash_size
+    paths = []
+    last = b""
+    pos = 12
+    for _ in range(count):
+        start = pos
+        mode = _U32.unpack_from(data, start + 24)[0]
+        flags = _U16.unpack_from(data, start + flags_at)[0]
+        pos = start + flags_at + 2
+        skip = False
+        if flags & FLAG_EXTENDED and version >= 3:
+            skip = _U16.unpack_from(data, pos)[0] & FLAG_SKIP_WORKTREE
+            pos += 2
+
+        if version == 4:
+            strip, pos = _varint(data, pos)
+            end = data.index(b"\0", pos)
+            name = last[:len(last) - strip] + data[pos:end]
+            pos = end + 1
+            last = name
+        else:
+            end = data.index(b"\0", pos)
+            name = data[pos:end]
+            # Entries are NUL-padded to a multiple of 8 bytes
+            pos = start + ((end - start + 8) & ~7)
+
+        kind = mode & MODE_TYPE_MASK
+        if skip or kind == MODE_GITLINK or kind == MODE_DIRECTORY:
+            continue
+        path = os.fsdecode(name)
+        if paths and paths[-1] == path:
+            continue  # conflict stages of the same path
+        paths.append(path)
+
+    # A split index keeps most entries in a shared file we do not read
+    end = len(data) - hash_size
+    while pos + 8 <= end:
+        signature = data[pos:pos + 4]
+        if signature == b"link":
+            raise ValueError("split git index is not supported")
+        pos += 8 + _U32.unpack_from(data, pos + 4)[0]
+    return paths
+
+def tracked_files(root: Path):
+    """
+    Paths relative to `root` of the files tracked by the git repository
+    containing it, or None when `root` is not inside a readable
+    repository.
+    """
+    repo = find_repo(root)
+    if repo is None:
+        return None
+    top, git_dir = repo
+    try:
+        paths = read_index(git_dir)
+    except (OSError, ValueError):
+        return None
+
+    prefix = relpath(Path(root).resolve(), top)
+    if not prefix:
+        return paths
+    prefix += "/"
+    return [p[len(prefix):] for p in paths if p.startswith(prefix)]
+
+def tracked_listings(rel_paths):
+    """
+    Group relative file paths by directory: rel dir -> (set of subdirectory
+    names, list of file names). Every ancestor directory gets an entry.
+    """
+    listings = {"": (set(), [])}
+    for path in rel_paths:
+        rel_dir, _, name = path.rpartition("/")
+        listing = listings.get(rel_dir)
+        if listing is None:
+            listing = listings[rel_dir] = (set(), [])
+            # Link the new directory into its ancestors
+            child = rel_dir
+            while child:
+                parent, _, child_name = child.rpartition("/")
+                parent_listing = listings.get(parent)
+                if parent_listing is not None:
+                    parent_listing[0].add(child_name)
+                    break
+                listings[parent] = ({child_name}, [])
+                child = parent
+        listing[1].append(name)
+    return listings
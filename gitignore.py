@@ -0,0 +1,242 @@
+import os
+import re
+from pathlib import Path
+
+# --- Pattern translation --- #
+
+def _translate_class(pat: str, i: int):
+    """Translate a [...] class starting at pat[i]; return (regex, next index)."""
+    j = i + 1
+    if j < len(pat) and pat[j] in "!^":
+        j += 1
+    if j < len(pat) and pat[j] == "]":
+        j += 1
+    while j < len(pat) and pat[j] != "]":
+        j += 2 if pat[j] == "\\" else 1
+    if j >= len(pat):
+        # Unclosed bracket: match it literally
+        return re.escape("["), i + 1
+
+    body = pat[i + 1:j]
+    negate = body[:1] in ("!", "^")
+    if negate:
+        body = body[1:]
+
+    # Rebuild the class item by item: escapes are resolved, and reversed
+    # ranges such as "z-a" (valid in git, an error in re) match nothing
+    items = []
+    k, n = 0, len(body)
+    while k < n:
+        if body[k] == "\\" and k + 1 < n:
+            k += 1
+        low = body[k]
+        k += 1
+        if k + 1 < n and body[k] == "-":
+            k += 1
+            if body[k] == "\\" and k + 1 < n:
+                k += 1
+            high = body[k]
+            k += 1
+            if low <= high:
+                items.append(f"{re.escape(low)}-{re.escape(high)}")
+        else:
+            items.append(re.escape(low))
+    if not items:
+        return ("[^/]" if negate else "(?!)"), j + 1
+    return ("[^/" if negate else "[") + "".join(items) + "]", j + 1
+
+
+def translate_pattern(pat: str) -> str:
+    """
+    Turn one gitignore glob (without "!" or trailing "/") into a regex
+    body matched against a path relative to the ignore file's directory.
+    """
+    # A slash anywhere but the end anchors the pattern to its directory
+    anchored = "/" in pat
+    if pat.startswith("/"):
+        pat = pat[1:]
+
+    out = []
+    i, n = 0, len(pat)
+    while i < n:
+        c = pat[i]
+        if c == "*":
+            if pat[i:i + 2] == "**" and (i == 0 or pat[i - 1] == "/"):
+                rest = pat[i + 2:i + 3]
+                if rest == "/":
+                    out.append("(?:.*/)?")
+                    i += 3
+                    continue
+                if rest == "":
+                    out.append(".*")
+                    i += 2
+                    continue
+            while i < n and pat[i] == "*":
+                i += 1
+            out.append("[^/]*")
+            continue
+        if c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            regex, i = _translate_class(pat, i)
+            out.append(regex)
+            continue
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pat[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+
+    body = "".join(out)
+    if not anchored:
+        body = "(?:.*/)?" + body
+    return body
+
+
+def _parse_line(line: str):
+    """Return (regex, negated, dir_only) for one ignore line, or None."""
+    if not line or line.startswith("#"):
+        return None
+
+    # Trailing spaces are ignored unless escaped with a backslash
+    stripped = line.rstrip(" ")
+    if stripped.endswith("\\") and len(stripped) < len(line):
+        stripped += " "
+    line = stripped
+    if not line:
+        return None
+
+    negated = line.startswith("!")
+    if negated:
+        line = line[1:]
+    elif line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    return translate_pattern(line), negated, dir_only
+
+# --- Compiled rule sets --- #
+
+def _compiles(body: str) -> bool:
+    try:
+        re.compile(body)
+    except re.error:
+        return False
+    return True
+
+class IgnoreRules:
+    """
+    All patterns from one ignore file, compiled into a single regex.
+    Alternatives are ordered last-pattern-first, so the alternative that
+    matches is the one git would apply ("last match wins").
+    """
+
+    def __init__(self, lines):
+        parsed = [r for r in (_parse_line(l) for l in lines) if r]
+        self.count = len(parsed)
+        self._dir_re, self._dir_neg = self._compile(parsed)
+        self._file_re, self._file_neg = self._compile(
+            [r for r in parsed if not r[2]]
+        )
+
+    @staticmethod
+    def _compile(rules):
+        if not rules:
+            return None, ()
+        rules = rules[::-1]
+        try:
+            regex = re.compile("|".join(f"({body})" for body, _, _ in rules), re.DOTALL)
+        except re.error:
+            # Drop the patterns that do not compile on their own (git
+            # treats them as matching nothing) instead of all of them
+            rules = [r for r in rules if _compiles(r[0])]
+            if not rules:
+                return None, ()
+            regex = re.compile("|".join(f"({body})" for body, _, _ in rules), re.DOTALL)
+        return regex, tuple(neg for _, neg, _ in rules)
+
+    def match(self, rel: str, is_dir: bool):
+        """Return True (ignored), False (re-included by "!") or None (no rule)."""
+        regex, negated = (
+            (self._dir_re, self._dir_neg) if is_dir
+            else (self._file_re, self._file_neg)
+        )
+        if regex is None:
+            return None
+        m = regex.fullmatch(rel)
+        if m is None:
+            return None
+        return not negated[m.lastindex - 1]
+
+
+def _read_rules(path: Path):
+    try:
+        lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
+    except OSError:
+        return None
+    rules = IgnoreRules(lines)
+    return rules if rules.count else None
+
+# --- Matcher for a whole repository --- #
+
+class GitIgnore:
+    """
+    Gitignore matcher for a project root.
+    Honours .git/info/exclude, the root .gitignore and nested .gitignore
+    files; deeper files take precedence over shallower ones. Paths are
+    posix strings relative to the root. Parent directories are expected
+    to have been checked already (walkers prune ignored directories).
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        # rel dir -> tuple of (base prefix, IgnoreRules), deepest first
+        self._chains = {}
+
+        exclude = _read_rules(self.root / ".git" / "info" / "exclude")
+        root_rules = _read_rules(self.root / ".gitignore")
+        chain = []
+        if root_rules:
+            chain.append(("", root_rules))
+        if exclude:
+            chain.append(("", exclude))
+        self._chains[""] = tuple(chain)
+
+    def _chain(self, rel_dir: str):
+        chain = self._chains.get(rel_dir)
+        if chain is not None:
+            return chain
+
+        parent = rel_dir.rpartition("/")[0]
+        chain = self._chain(parent)
+        rules = _read_rules(self.root / rel_dir / ".gitignore")
+        if rules:
+            chain = ((rel_dir + "/", rules),) + chain
+        self._chains[rel_dir] = chain
+        return chain
+
+    def load_dir(self, rel_dir: str):
+        """Read the ignore files that apply to entries of `rel_dir` now."""
+        self._chain(rel_dir)
+
+    def is_ignored(self, rel: str, is_dir: bool = False) -> bool:
+        """Return True if the path (relative to root) is gitignored."""
+        rel_dir = rel.rpartition("/")[0]
+        for base, rules in self._chain(rel_dir):
+            result = rules.match(rel[len(base):], is_dir)
+            if result is not None:
+                return result
+        return False
+
+
+def relpath(path, root) -> str:
+    """Posix path of `path` relative to `root`."""
+    rel = os.path.relpath(path, root)
+    if os.sep != "/":
+        rel = rel.replace(os.sep, "/")
+    return "" if rel == "." else rel
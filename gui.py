@@ -1,28 +1,190 @@
 import tkinter as tk 
 import tkinter.ttk as ttk 
 import os
+import re
 import json
-from tkinter import messagebox 
+import time
+from array import array
+from tkinter import messagebox, simpledialog
 from pathlib import Path 
 from tkinterdnd2 import TkinterDnD, DND_FILES 
-from scanner import scan_folder as scanner_run 
+from scanner import iter_folder, DirNode, ContentFilter 
 from dnd import handle_drop 
-from fnmatch import fnmatch
+from file_table import FileTable
+from jobs import BackgroundJob
+from exporter import (
+    export_files as export_paths, split_export, OUTPUT_FORMATS, TEXT_FORMATS, format_available,
+)
+from git_changes import ChangeDiffs, changed_files
+from path_index import PathIndex, MODES as FILTER_MODES
+from read_cache import ReadCache, disk_cache_enabled, get_cache_dir
+from appdata import get_app_dir
+from content_search import search_files
+from dedupe import Deduplicator
+from profiling import NULL_TRACE, new_trace, profiled, take_profile_request
+from scan_index import ScanIndex
+from structure import iter_structure, sorted_children
+from tokens import fit_budget, format_tokens
+from watcher import Changes, watch_worker, tree_dirs
+
+# Paths handed to the GUI per message, and the max delay between messages
+SCAN_BATCH_SIZE = 500
+SCAN_BATCH_INTERVAL = 0.05
+# How often the Tk thread drains the scan queue (ms)
+SCAN_POLL_MS = 30
+# How often the Tk thread checks the folder watcher (ms)
+WATCH_POLL_MS = 200
+# Structure page: tree rows inserted per expanded folder before a
+# "… more" row, and ASCII lines put on the clipboard per Tk tick
+TREE_BATCH = 500
+COPY_CHUNK_LINES = 5000
+
+# Filter box: quiet time after the last keystroke before searching (ms)
+FILTER_DELAY_MS = 120
+# File list rows: fixed pixel height, rows moved per wheel notch
+ROW_HEIGHT = 24
+SCROLL_ROWS = 3
+# Files larger than this are left out of the scan entirely
+SCAN_MAX_FILE_BYTES = 50 * 1024 * 1024
+# Files larger than this are cut off in the export with a marker
+EXPORT_MAX_FILE_BYTES = 10 * 1024 * 1024
+# "Files" choices next to the folder path -> iter_folder git_files mode
+FILE_SOURCES = {
+    "All files": None,
+    "Git tracked": "tracked",
+    "Git tracked + untracked": "tracked+untracked",
+}
+# Maps selection bytes 0 <-> 1 for Invert Selection
+INVERT_TABLE = bytes([1, 0]) + bytes(range(2, 256))
 
 
 def get_history_file(app_name="Otter"):
-    import sys, os
-    from pathlib import Path
+    return get_app_dir() / f"{app_name}_history.json"
 
-    if sys.platform.startswith("win"):
-        base_dir = Path(os.getenv("APPDATA", Path.home()))
-    elif sys.platform == "darwin":
-        base_dir = Path.home() / "Library" / "Application Support"
-    else:
-        base_dir = Path.home() / ".local" / "share"
 
-    base_dir.mkdir(parents=True, exist_ok=True)
-    return base_dir / f"{app_name}_history.json"
+# -------------------------------------------------
+# Scan worker: runs off the Tk thread, streams batches of paths
+# -------------------------------------------------
+def scan_worker(job, folder, trace=NULL_TRACE, git_files=None):
+    # Each batch is a small FileTable the Tk thread appends to its own
+    batch = FileTable(folder)
+    last_post = 0.0  # post the very first hit immediately
+
+    tree = DirNode(folder.name)
+    content_filter = ContentFilter(max_file_bytes=SCAN_MAX_FILE_BYTES)
+    with profiled(take_profile_request(), "scan"):
+        entries = iter_folder(
+            folder, job.cancel_event, ScanIndex(folder), tree, content_filter,
+            trace=trace, git_files=git_files, records=True,
+        )
+        for record in entries:
+            batch.add(*record)
+            now = time.monotonic()
+            if len(batch) >= SCAN_BATCH_SIZE or now - last_post >= SCAN_BATCH_INTERVAL:
+                job.post("batch", batch)
+                batch = FileTable(folder)
+                last_post = now
+
+        job.check_cancelled()
+        if batch:
+            job.post("batch", batch)
+
+        job.post("tree", tree)
+
+
+# -------------------------------------------------
+# Content search worker: streams indexes of files whose contents match
+# -------------------------------------------------
+def grep_worker(job, paths, pattern):
+    job.matched = search_files(
+        paths, pattern, cancel=job.cancel_event,
+        on_matches=lambda indexes: job.post("matches", indexes),
+    )
+
+
+# -------------------------------------------------
+# Changed files worker: indexes of the files changed against a git ref
+# -------------------------------------------------
+def changed_worker(job, folder, rel_paths, ref):
+    changed = {path for path, status in changed_files(folder, ref).items() if status != "D"}
+    indexes = [i for i, rel in enumerate(rel_paths) if rel in changed]
+    if indexes:
+        job.post("matches", indexes)
+
+
+# -------------------------------------------------
+# Refresh worker: rescans a watched folder after a change
+# -------------------------------------------------
+def refresh_worker(job, folder, watcher=None, git_files=None):
+    # The scan index re-lists only directories whose mtime changed and
+    # the sniff cache skips unchanged files, so this stays cheap
+    tree = DirNode(folder.name)
+    content_filter = ContentFilter(max_file_bytes=SCAN_MAX_FILE_BYTES)
+    table = FileTable(folder)
+    for record in iter_folder(
+        folder, job.cancel_event, ScanIndex(folder), tree, content_filter,
+        git_files=git_files, records=True,
+    ):
+        table.add(*record)
+    job.check_cancelled()
+
+    if watcher is not None:
+        try:
+            watcher.set_dirs(tree_dirs(tree))
+        except OSError:
+            pass  # out of inotify watches: new folders go unwatched
+    job.post("refreshed", (table, tree))
+
+
+# -------------------------------------------------
+# Export worker: streams selected files into the output off the Tk thread
+# -------------------------------------------------
+def export_worker(job, paths, out_path, read_cache=None, trace=NULL_TRACE,
+                  fmt="text", root=None, dedupe=False, diff_ref=None, split_tokens=None,
+                  tokens=None):
+    last_post = 0.0
+
+    def progress(done, total):
+        nonlocal last_post
+        now = time.monotonic()
+        if done == total or now - last_post >= SCAN_BATCH_INTERVAL:
+            job.post("progress", done)
+            last_post = now
+
+    with trace.stage("export"):
+        if split_tokens:
+            result = split_export(
+                paths, out_path, split_tokens, "tokens", tokens,
+                max_file_bytes=EXPORT_MAX_FILE_BYTES,
+                progress=progress, cancel=job.cancel_event,
+                cache=read_cache, fmt=fmt, root=root,
+                dedupe=Deduplicator() if dedupe else None,
+            )
+        else:
+            result = export_paths(
+                paths, out_path,
+                max_file_bytes=EXPORT_MAX_FILE_BYTES,
+                progress=progress, cancel=job.cancel_event,
+                cache=read_cache, fmt=fmt, root=root,
+                dedupe=Deduplicator() if dedupe else None,
+                diff=ChangeDiffs(root, diff_ref) if diff_ref else None,
+            )
+    trace.count("files_exported", result.files)
+    trace.count("bytes_read", result.bytes_read)
+    trace.count("files_truncated", result.truncated)
+    trace.count("files_failed", result.failed)
+    trace.count("files_duplicate", result.duplicates)
+    if read_cache is not None:
+        trace.info["read_cache"] = read_cache.stats()
+    job.post("result", (result, out_path))
+
+
+def write_trace(trace):
+    """Save a finished trace; tracing must never break a scan or export."""
+    try:
+        trace.write()
+    except OSError:
+        pass
 
 
 # -------------------------------------------------
@@ -42,10 +204,43 @@ def launch_app():
 class UI:
     def __init__(self, root):
         self.root = root
-        self.files = []
-        self.file_vars = []
+        # Scanned files (paths, token estimates, sizes) of the current folder
+        self.table = FileTable(Path())
+        # One byte per row of self.table: 1 = selected
+        self.selected = bytearray()
+        self.selected_count = 0
+        self.total_tokens = 0
+        self.selected_tokens = 0
         self.current_folder = None
-        self.structure_text = None
+        # git_files mode of the current scan (see FILE_SOURCES)
+        self.git_files = None
+        self.tree = None
+        # Structure page: the tree it currently shows, Treeview item -> DirNode
+        # and (node, items shown) for "… more" rows
+        self.structure_tree = None
+        self.tree_items = {}
+        self.tree_more = {}
+        self.copy_job = None
+        self.scan_job = None
+        self.export_job = None
+        # Opt-in profiling of the current scan (OTTER_TRACE)
+        self.scan_trace = NULL_TRACE
+        # Watch mode: watcher job, running refresh and changes not yet applied
+        self.watch_job = None
+        self.refresh_job = None
+        self.pending_changes = Changes()
+        # Filter box: index of relative paths and the matching file indexes
+        # (None while the filter is empty and every file is listed)
+        self.path_index = PathIndex()
+        # Pending debounced filter run (an after() id)
+        self.filter_after = None
+        self.view = None
+        # Content search or changed-files job selecting files
+        self.grep_job = None
+        # Git ref of the last "Select Changed" (offered for diff exports)
+        self.diff_ref = None
+        # Rendered file contents shared by all exports in this session
+        self.read_cache = None
 
         self.main_container = tk.Frame(self.root)
         self.main_container.pack(fill="both", expand=True)
@@ -111,7 +306,14 @@ class UI:
         toolbar.grid_propagate(False)
 
         toolbar.grid_columnconfigure(0, weight=1)
-        toolbar.grid_columnconfigure(1, weight=0)
+
+        # Limits for the copied ASCII tree (0 = no limit)
+        tk.Label(toolbar, text="Depth:").grid(row=0, column=1)
+        self.copy_depth = tk.Spinbox(toolbar, from_=0, to=99, width=3)
+        self.copy_depth.grid(row=0, column=2, padx=(2, 8))
+        tk.Label(toolbar, text="Max per folder:").grid(row=0, column=3)
+        self.copy_entries = tk.Spinbox(toolbar, from_=0, to=100000, increment=50, width=6)
+        self.copy_entries.grid(row=0, column=4, padx=(2, 8))
 
         # Copy button for structure output
         self.copy_btn = tk.Button(
@@ -120,31 +322,25 @@ class UI:
             width=8,
             command=self.copy_structure_graph
         )
-        self.copy_btn.grid(row=0, column=1, padx=5)
+        self.copy_btn.grid(row=0, column=5, padx=5)
 
-        text_frame = tk.Frame(main_container)
-        text_frame.grid(row=1, column=0, sticky="nsew", padx=5, pady=(0, 5))
+        tree_frame = tk.Frame(main_container)
+        tree_frame.grid(row=1, column=0, sticky="nsew", padx=5, pady=(0, 5))
 
-        text_frame.grid_rowconfigure(0, weight=1)
-        text_frame.grid_columnconfigure(0, weight=1)
-        text_frame.grid_columnconfigure(1, weight=0)
+        tree_frame.grid_rowconfigure(0, weight=1)
+        tree_frame.grid_columnconfigure(0, weight=1)
+        tree_frame.grid_columnconfigure(1, weight=0)
 
-        scrollbar = tk.Scrollbar(text_frame)
+        scrollbar = tk.Scrollbar(tree_frame)
         scrollbar.grid(row=0, column=1, sticky="ns")
 
-        # Read-only text widget for structure tree
-        txt = tk.Text(
-            text_frame, 
-            wrap="none",
-            yscrollcommand=scrollbar.set,
-            width=70,
-            height=20
-        )
-        txt.grid(row=0, column=0, sticky="nsew")
-        scrollbar.config(command=txt.yview)
-
-        txt.configure(state="disabled")
-        self.structure_text = txt
+        # Folders are filled in only when expanded
+        view = ttk.Treeview(tree_frame, show="tree", yscrollcommand=scrollbar.set, height=20)
+        view.grid(row=0, column=0, sticky="nsew")
+        scrollbar.config(command=view.yview)
+        view.bind("<<TreeviewOpen>>", self._on_tree_open)
+        view.bind("<Double-1>", self._on_tree_double_click)
+        self.structure_view = view
 
     # -------------------------------------------------
     # Switch between different UI pages
@@ -157,19 +353,12 @@ class UI:
         self.current_page.pack(fill="both", expand=True)
         self.root.update_idletasks()
 
-        # Refresh file list canvas when returning to main page
-        if page_name == "main" and self.files:
-            self._force_canvas_refresh()
-
-    # -------------------------------------------------
-    # Force canvas to update and adjust scroll region
-    # -------------------------------------------------
-    def _force_canvas_refresh(self):
-        self.canvas.update_idletasks()
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        self.canvas.yview_moveto(0)
-        self.root.after(10, lambda: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
-        self.root.after(20, lambda: self.canvas.update_idletasks())
+        # Refresh visible file rows when returning to main page
+        if page_name == "main" and self.table:
+            self._render_rows()
+        # The structure tree is only built once the page is visited
+        if page_name == "structure" and self.structure_tree is not self.tree:
+            self._build_structure_view()
 
     # -------------------------------------------------
     # Build layout for main page
@@ -209,6 +398,14 @@ class UI:
         # OK Button
         tk.Button(row_frame, text="OK", command=self.scan).grid(row=0, column=3, padx=5)
 
+        # Where file names come from: a walk of the folder or the git index
+        tk.Label(row_frame, text="Files:").grid(row=0, column=4, padx=(10, 2))
+        self.source_var = tk.StringVar(value=next(iter(FILE_SOURCES)))
+        ttk.Combobox(
+            row_frame, textvariable=self.source_var, values=list(FILE_SOURCES),
+            state="readonly", width=22,
+        ).grid(row=0, column=5, padx=5)
+
     # -------------------------------------------------
     # Build drag-and-drop folder zone
     # -------------------------------------------------
@@ -252,17 +449,15 @@ class UI:
     # -------------------------------------------------
     def _on_mousewheel(self, event):
         try:
-            if hasattr(event, 'delta'):
-                delta = event.delta
-                if delta > 0:
-                    self.canvas.yview_scroll(-1, "units")
-                else:
-                    self.canvas.yview_scroll(1, "units")
+            if getattr(event, "num", None) == 4:
+                step = -SCROLL_ROWS
+            elif getattr(event, "num", None) == 5:
+                step = SCROLL_ROWS
+            elif getattr(event, "delta", 0) > 0:
+                step = -SCROLL_ROWS
             else:
-                self.canvas.yview_scroll(1, "units")
-
-            self.canvas.update_idletasks()
-            return "break"
+                step = SCROLL_ROWS
+            self._scroll_to(self.top_index + step)
         except:
             pass
         return "break"
@@ -280,13 +475,13 @@ class UI:
     # Check if scroll event is inside file list widgets
     # -------------------------------------------------
     def _is_in_file_list_area(self, widget):
-        if widget in [self.canvas, self.scroll_frame]:
+        if widget == self.list_frame:
             return True
 
         try:
             parent = widget.master
             while parent:
-                if parent == self.scroll_frame:
+                if parent == self.list_frame:
                     return True
                 parent = parent.master
         except:
@@ -295,7 +490,8 @@ class UI:
         return False
 
     # -------------------------------------------------
-    # Build file list area with scrollable canvas
+    # Build file list area (virtualized: a fixed pool of
+    # row widgets is recycled as the list scrolls)
     # -------------------------------------------------
     def build_file_list_area(self, parent):
         parent.grid_rowconfigure(2, weight=1)
@@ -320,19 +516,54 @@ class UI:
         bar.grid_columnconfigure(1, weight=1)
         bar.grid_columnconfigure(2, weight=0)
         bar.grid_columnconfigure(3, weight=0)
+        bar.grid_columnconfigure(4, weight=0)
 
         tk.Button(
             bar, text="Clear", command=self.clear_all
         ).grid(row=0, column=0, padx=5, sticky="w")
 
+        # Selected file count and estimated token total
+        self.selection_label = tk.Label(bar, text="", fg="#555")
+        self.selection_label.grid(row=0, column=1, padx=5, sticky="w")
+
+        # Keep the list and structure in sync with the folder
+        self.watch_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            bar, text="Watch", variable=self.watch_var,
+            command=self.toggle_watch
+        ).grid(row=0, column=2, padx=5, sticky="e")
+
         tk.Checkbutton(
             bar, text="Select All", variable=self.select_all_var,
             command=self.toggle_select_all
-        ).grid(row=0, column=2, padx=5, sticky="e")
+        ).grid(row=0, column=3, padx=5, sticky="e")
 
         tk.Button(
             bar, text="Invert Selection", command=self.do_invert
-        ).grid(row=0, column=3, padx=10, sticky="e")
+        ).grid(row=0, column=4, padx=10, sticky="e")
+
+        # Filter box: narrows the list as you type
+        filter_row = tk.Frame(bar)
+        filter_row.grid(row=1, column=0, columnspan=5, sticky="ew", pady=(8, 0))
+        tk.Label(filter_row, text="Filter:").pack(side="left", padx=5)
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", lambda *_: self.schedule_filter())
+        tk.Entry(filter_row, textvariable=self.filter_var).pack(side="left", fill="x", expand=True)
+        self.filter_mode = ttk.Combobox(
+            filter_row, values=FILTER_MODES, width=9, state="readonly"
+        )
+        self.filter_mode.set(FILTER_MODES[0])
+        self.filter_mode.bind("<<ComboboxSelected>>", lambda e: self.apply_filter())
+        self.filter_mode.pack(side="left", padx=5)
+        tk.Button(
+            filter_row, text="Select Matching", command=self.select_matching
+        ).pack(side="left", padx=(0, 5))
+        tk.Button(
+            filter_row, text="Search Contents…", command=self.select_by_content
+        ).pack(side="left", padx=(0, 5))
+        tk.Button(
+            filter_row, text="Select Changed…", command=self.select_changed
+        ).pack(side="left", padx=(0, 10))
 
         bar.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 5))
         bar.grid_remove()
@@ -350,21 +581,18 @@ class UI:
         scroll_container.grid_columnconfigure(0, weight=1)
         scroll_container.grid_columnconfigure(1, weight=0)
 
-        self.canvas = tk.Canvas(scroll_container)
-        self.scroll_frame = tk.Frame(self.canvas)
+        # Row widgets live here; only as many as fit on screen
+        self.list_frame = tk.Frame(scroll_container)
+        self.list_frame.bind("<Configure>", self._on_list_configure)
 
-        # Frame inside canvas
-        self.scrollable_frame_container = self.canvas.create_window((0, 0), window=self.scroll_frame, anchor="nw")
+        self.list_scrollbar = tk.Scrollbar(scroll_container, orient="vertical", command=self._on_scrollbar)
 
-        self.scroll_frame.bind("<Configure>", self._on_frame_configure)
-        self.canvas.bind("<Configure>", self._on_canvas_configure)
+        self.list_frame.grid(row=0, column=0, sticky="nsew")
+        self.list_scrollbar.grid(row=0, column=1, sticky="ns")
 
-        # Scrolling setup
-        scrollbar = tk.Scrollbar(scroll_container, orient="vertical", command=self.canvas.yview)
-        self.canvas.configure(yscrollcommand=scrollbar.set)
-
-        self.canvas.grid(row=0, column=0, sticky="nsew")
-        scrollbar.grid(row=0, column=1, sticky="ns")
+        self.top_index = 0
+        self.row_widgets = []
+        self.row_vars = []
 
         self._setup_macos_scroll(scroll_container)
 
@@ -372,41 +600,278 @@ class UI:
     # Bind macOS-compatible scrolling
     # -------------------------------------------------
     def _setup_macos_scroll(self, scroll_container):
-        widgets = [self.canvas, self.scroll_frame, self.container, scroll_container]
+        widgets = [self.list_frame, self.container, scroll_container]
 
         for widget in widgets:
-            widget.bind("<MouseWheel>", self._on_mousewheel)
-            widget.bind("<Button-4>", self._on_mousewheel)
-            widget.bind("<Button-5>", self._on_mousewheel)
-            widget.bind("<Shift-MouseWheel>", self._on_mousewheel)
+            self._bind_mousewheel(widget)
 
         self.root.bind("<MouseWheel>", self._on_global_mousewheel)
         self.root.bind("<Button-4>", self._on_global_mousewheel)
         self.root.bind("<Button-5>", self._on_global_mousewheel)
         self.root.bind("<Shift-MouseWheel>", self._on_global_mousewheel)
 
+    def _bind_mousewheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_mousewheel)
+        widget.bind("<Button-4>", self._on_mousewheel)
+        widget.bind("<Button-5>", self._on_mousewheel)
+        widget.bind("<Shift-MouseWheel>", self._on_mousewheel)
+
     # -------------------------------------------------
-    # Update scroll region when frame content changes
+    # Grow the row pool to fill the visible list height
     # -------------------------------------------------
-    def _on_frame_configure(self, event=None):
-        try:
-            bbox = self.canvas.bbox("all")
-            if bbox:
-                self.canvas.configure(scrollregion=bbox)
+    def _on_list_configure(self, event=None):
+        height = self.list_frame.winfo_height()
+        needed = max(1, height // ROW_HEIGHT + 1)
+
+        while len(self.row_widgets) < needed:
+            row = len(self.row_widgets)
+            var = tk.BooleanVar(value=False)
+            cb = tk.Checkbutton(
+                self.list_frame, variable=var, anchor="w",
+                command=lambda r=row: self._toggle_row(r)
+            )
+            self._bind_mousewheel(cb)
+            self.row_widgets.append(cb)
+            self.row_vars.append(var)
+
+        self._scroll_to(self.top_index)
+
+    # -------------------------------------------------
+    # Number of rows that fit completely in the list area
+    # -------------------------------------------------
+    def _visible_rows(self):
+        return max(1, self.list_frame.winfo_height() // ROW_HEIGHT)
+
+    # -------------------------------------------------
+    # Scrollbar callback ("moveto" / "scroll" commands)
+    # -------------------------------------------------
+    def _on_scrollbar(self, *args):
+        if not args:
+            return
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * self._view_size()))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self._visible_rows()
+            self._scroll_to(self.top_index + amount)
+
+    # -------------------------------------------------
+    # Move the first visible row and redraw
+    # -------------------------------------------------
+    def _scroll_to(self, index):
+        last_top = max(0, self._view_size() - self._visible_rows())
+        self.top_index = min(max(0, index), last_top)
+        self._render_rows()
+
+    # -------------------------------------------------
+    # Bind pooled row widgets to the files currently in view
+    # -------------------------------------------------
+    def _render_rows(self):
+        total = self._view_size()
+
+        for row, (cb, var) in enumerate(zip(self.row_widgets, self.row_vars)):
+            idx = self.top_index + row
+            if idx < total:
+                if self.view is not None:
+                    idx = self.view[idx]
+                rel = self.table.rel(idx)
+                cb.config(text=rel if os.sep == "/" else rel.replace("/", os.sep))
+                var.set(bool(self.selected[idx]))
+                cb.place(x=5, y=row * ROW_HEIGHT, relwidth=1, width=-10, height=ROW_HEIGHT)
             else:
-                self.canvas.configure(scrollregion=(0, 0, 0, 0))
-        except:
-            pass
+                cb.place_forget()
+
+        if total:
+            first = self.top_index / total
+            last = min(1.0, (self.top_index + self._visible_rows()) / total)
+            self.list_scrollbar.set(first, last)
+        else:
+            self.list_scrollbar.set(0, 1)
+
+    # -------------------------------------------------
+    # Rows currently listed: all files, or the filter matches
+    # -------------------------------------------------
+    def _view_size(self):
+        return len(self.table) if self.view is None else len(self.view)
+
+    # -------------------------------------------------
+    # Filter box: recompute the matching rows
+    # -------------------------------------------------
+    def schedule_filter(self):
+        # Typing restarts the delay, so a burst of keystrokes searches once
+        if self.filter_after is not None:
+            self.root.after_cancel(self.filter_after)
+        self.filter_after = self.root.after(FILTER_DELAY_MS, self.apply_filter)
+
+    def apply_filter(self):
+        if self.filter_after is not None:
+            self.root.after_cancel(self.filter_after)
+            self.filter_after = None
+        query = self.filter_var.get()
+        if query.strip():
+            self.view = self.path_index.search(query, self.filter_mode.get())
+        else:
+            self.view = None
+        self._scroll_to(0)
+        self.update_select_all_state()
+
+    def _index_rows(self):
+        # Rows of self.table not yet in the path index
+        start = len(self.path_index)
+        self.path_index.add(self.table.rels(range(start, len(self.table))))
+        query = self.filter_var.get()
+        if self.view is not None and query.strip():
+            self.view.extend(self.path_index.search(query, self.filter_mode.get(), start))
+
+    # -------------------------------------------------
+    # Select the filtered files (or deselect if all already are)
+    # -------------------------------------------------
+    def select_matching(self):
+        if self.filter_after is not None:
+            self.apply_filter()
+        if self.view is None:
+            return
+        value = 0 if all(self.selected[i] for i in self.view) else 1
+        for i in self.view:
+            if self.selected[i] != value:
+                self.selected[i] = value
+                sign = 1 if value else -1
+                self.selected_count += sign
+                self.selected_tokens += sign * self.table.tokens[i]
+        self._render_rows()
+        self.update_select_all_state()
+
+    # -------------------------------------------------
+    # Select files whose contents match a regular expression
+    # -------------------------------------------------
+    def select_by_content(self):
+        if not self.table or self.scan_job is not None or self.grep_job is not None:
+            return
+        pattern = simpledialog.askstring(
+            "Search Contents",
+            "Select files whose contents match this regular expression\n"
+            "(prefix with (?i) to ignore case):",
+            parent=self.root,
+        )
+        if not pattern:
+            return
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            messagebox.showerror("Search Contents", f"Invalid regular expression:\n{e}")
+            return
 
-        self.canvas.update_idletasks()
+        self._start_select_job("Search Contents", grep_worker, self.table.path_strings(), pattern)
 
     # -------------------------------------------------
-    # Ensure frame width matches canvas width
+    # Select only the files changed against a git ref
     # -------------------------------------------------
-    def _on_canvas_configure(self, event=None):
-        if event:
-            self.canvas.itemconfig(self.scrollable_frame_container, width=event.width)
-        self._on_frame_configure()
+    def select_changed(self):
+        if not self.table or self.scan_job is not None or self.grep_job is not None:
+            return
+        ref = simpledialog.askstring(
+            "Select Changed",
+            "Select the files changed against this git ref\n"
+            "(branch, tag or commit; untracked files are included):",
+            initialvalue=self.diff_ref or "HEAD",
+            parent=self.root,
+        )
+        if not ref or not ref.strip():
+            return
+        ref = ref.strip()
+
+        # The current selection is only replaced once git has answered, so
+        # an unknown ref or a folder outside git leaves it as it was
+        def replace_selection():
+            self.diff_ref = ref
+            self.select_all_var.set(False)
+            self.toggle_select_all()
+
+        self._start_select_job(
+            "Select Changed", changed_worker, self.current_folder, self.table.rels(), ref,
+            on_success=replace_selection,
+        )
+
+    def _start_select_job(self, title, target, *args, on_success=None):
+        for w in self.bottom_bar.winfo_children():
+            w.grid_forget()
+        self.grep_status.config(text="Searching… 0 matches")
+        self.grep_status.grid(row=0, column=0, padx=5)
+        self.btn_cancel_grep.grid(row=0, column=1, padx=5)
+
+        job = BackgroundJob(target, *args)
+        # Matches are indexes into this list; a watch refresh replaces it
+        job.files = self.table
+        job.count = 0
+        job.title = title
+        # Called once, before the first match is applied or when the job
+        # finishes without matches
+        job.on_success = on_success
+        self.grep_job = job.start()
+        self.root.after(SCAN_POLL_MS, self._poll_grep, job)
+
+    def cancel_grep(self):
+        job = self.grep_job
+        if job is None:
+            return
+        job.cancel()
+        self.grep_job = None
+        self._show_footer_buttons()
+
+    def _poll_grep(self, job):
+        if job is not self.grep_job:
+            return
+
+        for kind, payload in job.drain():
+            if kind == "matches":
+                if job.files is not self.table:
+                    continue
+                self._select_job_succeeded(job)
+                for i in payload:
+                    if not self.selected[i]:
+                        self.selected[i] = 1
+                        self.selected_count += 1
+                        self.selected_tokens += self.table.tokens[i]
+                job.count += len(payload)
+                self.grep_status.config(text=f"Searching… {job.count} matches")
+                self._render_rows()
+                self.update_select_all_state()
+            elif kind in ("error", "done", "cancelled"):
+                self.grep_job = None
+                self._show_footer_buttons()
+                if kind == "error":
+                    messagebox.showerror(job.title, f"Search failed:\n{payload}")
+                elif kind == "done":
+                    if job.files is self.table:
+                        self._select_job_succeeded(job)
+                    messagebox.showinfo(job.title, f"{job.count} matching file(s) selected.")
+                return
+
+        self.root.after(SCAN_POLL_MS, self._poll_grep, job)
+
+    def _select_job_succeeded(self, job):
+        callback, job.on_success = job.on_success, None
+        if callback is not None:
+            callback()
+
+    # -------------------------------------------------
+    # A row checkbox was clicked
+    # -------------------------------------------------
+    def _toggle_row(self, row):
+        idx = self.top_index + row
+        if idx >= self._view_size():
+            return
+        if self.view is not None:
+            idx = self.view[idx]
+
+        value = 1 if self.row_vars[row].get() else 0
+        if self.selected[idx] != value:
+            self.selected[idx] = value
+            sign = 1 if value else -1
+            self.selected_count += sign
+            self.selected_tokens += sign * self.table.tokens[idx]
+        self.update_select_all_state()
 
     # -------------------------------------------------
     # Build bottom bar with export buttons
@@ -418,20 +883,63 @@ class UI:
         self.btn_export = tk.Button(self.bottom_bar, text="Export Selected Files", command=self.export_files)
         self.btn_structure = tk.Button(self.bottom_bar, text="Project Structure", command=lambda: self.show_page("structure"))
 
+        # Optional token budget for the export (empty = no limit)
+        self.budget_label = tk.Label(self.bottom_bar, text="Token budget:")
+        self.budget_entry = tk.Entry(self.bottom_bar, width=9)
+        # Optional part size: split the export into parts of N tokens
+        self.split_label = tk.Label(self.bottom_bar, text="Split every (tokens):")
+        self.split_entry = tk.Entry(self.bottom_bar, width=9)
+
+        # Output format of the export file
+        self.format_var = tk.StringVar(value="text")
+        self.format_box = ttk.Combobox(
+            self.bottom_bar, textvariable=self.format_var, width=6, state="readonly",
+            values=[fmt for fmt in OUTPUT_FORMATS if format_available(fmt)],
+        )
+        # Write identical files once (text formats only)
+        self.dedupe_var = tk.BooleanVar(value=False)
+        self.dedupe_check = tk.Checkbutton(
+            self.bottom_bar, text="Collapse duplicates", variable=self.dedupe_var
+        )
+        # Export diffs against the "Select Changed" ref instead of contents
+        self.diff_var = tk.BooleanVar(value=False)
+        self.diff_check = tk.Checkbutton(self.bottom_bar, variable=self.diff_var)
+
+        # Shown only while a scan is running
+        self.scan_status = tk.Label(self.bottom_bar, text="")
+        self.btn_cancel_scan = tk.Button(self.bottom_bar, text="Cancel", command=self.cancel_scan)
+
+        # Shown only while a content search is running
+        self.grep_status = tk.Label(self.bottom_bar, text="")
+        self.btn_cancel_grep = tk.Button(self.bottom_bar, text="Cancel", command=self.cancel_grep)
+
+        # Shown only while an export is running
+        self.export_progress = ttk.Progressbar(self.bottom_bar, length=250, mode="determinate")
+        self.btn_cancel_export = tk.Button(self.bottom_bar, text="Cancel", command=self.cancel_export)
+
     # -------------------------------------------------
     # Reset UI state and clear all loaded files
     # -------------------------------------------------
     def clear_all(self):
+        self.cancel_scan()
+        self.cancel_export()
+        self.cancel_grep()
+        self.stop_watch()
         self.folder_entry.delete(0, tk.END)
 
-        # Remove all checkboxes
-        for w in list(self.scroll_frame.winfo_children()):
-            w.destroy()
-
-        self.files = []
-        self.file_vars = []
+        self.table = FileTable(Path())
+        self.selected = bytearray()
+        self.selected_count = 0
+        self.total_tokens = 0
+        self.selected_tokens = 0
+        self.path_index = PathIndex()
+        self.view = None if self.view is None else array("I")
         self.current_folder = None
+        self.tree = None
+        self.diff_ref = None
+        self.diff_var.set(False)
         self.select_all_var.set(False)
+        self.filter_var.set("")
 
         self.selection_bar.grid_remove()
         self.separator.grid_remove()
@@ -440,7 +948,7 @@ class UI:
         for w in self.bottom_bar.winfo_children():
             w.grid_forget()
 
-        self._on_frame_configure()
+        self._scroll_to(0)
 
     # -------------------------------------------------
     # Scan selected folder for files (delegates to scanner)
@@ -464,61 +972,258 @@ class UI:
         except:
             pass
 
+        # Abort any scan, export, search or watch that is still running
+        self.cancel_scan()
+        self.cancel_export()
+        self.cancel_grep()
+        self.stop_watch()
+
         self.current_folder = folder
+        self.tree = None
+        self.diff_ref = None
+        self.diff_var.set(False)
         self.select_all_var.set(False)
 
-        # Clear previous file widgets
-        for w in list(self.scroll_frame.winfo_children()):
-            w.destroy()
+        self.table = FileTable(folder)
+        self.selected = bytearray()
+        self.selected_count = 0
+        self.total_tokens = 0
+        self.selected_tokens = 0
+        self.path_index = PathIndex()
+        self.view = None if self.view is None else array("I")
+        self._clear_structure_view()
+        self._scroll_to(0)
+
+        for w in self.bottom_bar.winfo_children():
+            w.grid_forget()
+
+        self.scan_status.config(text="Scanning… 0 files")
+        self.scan_status.grid(row=0, column=0, padx=5)
+        self.btn_cancel_scan.grid(row=0, column=1, padx=5)
+
+        self.scan_trace = new_trace("scan")
+        self.git_files = FILE_SOURCES[self.source_var.get()]
+        self.scan_job = BackgroundJob(
+            scan_worker, folder, self.scan_trace, self.git_files
+        ).start()
+        self.root.after(SCAN_POLL_MS, self._poll_scan, self.scan_job)
+
+    # -------------------------------------------------
+    # Cancel the running scan, if any
+    # -------------------------------------------------
+    def cancel_scan(self):
+        job = self.scan_job
+        if job is None or job.finished:
+            return
+
+        job.cancel()
+        job.finished = True
+        self.scan_job = None
+        self.scan_status.config(text=f"Scan cancelled ({len(self.table)} files)")
+        self.btn_cancel_scan.grid_forget()
+        if self.table:
+            self._show_footer_buttons()
+
+    # -------------------------------------------------
+    # Drain scan results from the worker (runs on the Tk thread)
+    # -------------------------------------------------
+    def _poll_scan(self, job):
+        # Stale job (superseded or cancelled): drop its messages
+        if job is not self.scan_job:
+            return
+
+        for kind, payload in job.drain():
+            if kind == "batch":
+                with self.scan_trace.stage("widgets"):
+                    self._add_file_rows(payload)
+                self.scan_status.config(text=f"Scanning… {len(self.table)} files")
+            elif kind == "tree":
+                self.tree = payload
+            elif kind == "error":
+                job.finished = True
+                self.scan_job = None
+                self._finish_scan()
+                messagebox.showerror("Scan Error", f"Failed to scan folder:\n{payload}")
+                return
+            elif kind in ("done", "cancelled"):
+                job.finished = True
+                self.scan_job = None
+                self._finish_scan()
+                return
 
-        self.files = scanner_run(folder)
-        self.file_vars = []
+        self.root.after(SCAN_POLL_MS, self._poll_scan, job)
 
-        if not self.files:
+    # -------------------------------------------------
+    # Append newly found files to the list
+    # -------------------------------------------------
+    def _add_file_rows(self, batch):
+        if not self.table:
+            self.selection_bar.grid()
+            self.separator.grid()
+
+        self.table.extend(batch)
+        self.total_tokens += sum(batch.tokens)
+        self.selected.extend(bytes(len(batch)))
+        self._index_rows()
+
+        # New rows are unchecked, so "Select All" no longer holds
+        self.update_select_all_state()
+        self._render_rows()
+
+    # -------------------------------------------------
+    # Scan finished: show footer buttons or the empty-result notice
+    # -------------------------------------------------
+    def _finish_scan(self):
+        self.scan_status.grid_forget()
+        self.btn_cancel_scan.grid_forget()
+        write_trace(self.scan_trace)
+
+        if not self.table:
             messagebox.showinfo("No Files Found", "No eligible files found in this folder!")
             self.selection_bar.grid_remove()
             self.separator.grid_remove()
+            return
+
+        self._render_rows()
+        self._show_footer_buttons()
+        if self.watch_var.get() and self.tree is not None:
+            self.start_watch()
+
+    # -------------------------------------------------
+    # Watch mode: start/stop following changes in the folder
+    # -------------------------------------------------
+    def toggle_watch(self):
+        if self.watch_var.get():
+            if self.scan_job is None and self.tree is not None:
+                self.start_watch()
+        else:
+            self.stop_watch()
+
+    def start_watch(self):
+        self.stop_watch()
+        self.watch_job = BackgroundJob(
+            watch_worker, self.current_folder, tree_dirs(self.tree)
+        ).start()
+        self.root.after(WATCH_POLL_MS, self._poll_watch, self.watch_job)
+
+    def stop_watch(self):
+        if self.watch_job is not None:
+            self.watch_job.cancel()
+            self.watch_job = None
+        if self.refresh_job is not None:
+            self.refresh_job.cancel()
+            self.refresh_job = None
+        self.pending_changes = Changes()
 
-            for w in self.bottom_bar.winfo_children():
-                w.grid_forget()
+    # -------------------------------------------------
+    # Drain debounced change batches from the watcher (Tk thread)
+    # -------------------------------------------------
+    def _poll_watch(self, job):
+        if job is not self.watch_job:
             return
 
-        self.selection_bar.grid()
-        self.separator.grid()
+        for kind, payload in job.drain():
+            if kind == "changed":
+                self.pending_changes.update(payload)
+            elif kind in ("error", "done", "cancelled"):
+                self.watch_job = None
+                self.watch_var.set(False)
+                return
 
-        # Create a checkbox for each file
-        for i, p in enumerate(self.files):
-            var = tk.BooleanVar(value=False)
-            frame = tk.Frame(self.scroll_frame)
-            frame.grid(row=i, column=0, sticky="ew", padx=5, pady=1)
-            frame.grid_columnconfigure(0, weight=1)
+        if self.pending_changes and self.refresh_job is None:
+            self._start_refresh()
+        self.root.after(WATCH_POLL_MS, self._poll_watch, job)
 
-            cb = tk.Checkbutton(
-                frame, text=str(p.relative_to(folder)),
-                variable=var, anchor="w", command=self.update_select_all_state
-            )
-            cb.grid(row=0, column=0, sticky="w")
+    def _start_refresh(self):
+        job = BackgroundJob(
+            refresh_worker, self.current_folder, getattr(self.watch_job, "watcher", None),
+            self.git_files,
+        )
+        job.renames = self.pending_changes.renames
+        self.pending_changes = Changes()
+        self.refresh_job = job.start()
+        self.root.after(SCAN_POLL_MS, self._poll_refresh, job)
 
-            for widget in [frame, cb]:
-                widget.bind("<MouseWheel>", self._on_mousewheel)
-                widget.bind("<Button-4>", self._on_mousewheel)
-                widget.bind("<Button-5>", self._on_mousewheel)
-                widget.bind("<Shift-MouseWheel>", self._on_mousewheel)
+    def _poll_refresh(self, job):
+        if job is not self.refresh_job:
+            return
 
-            self.file_vars.append(var)
+        for kind, payload in job.drain():
+            if kind == "refreshed":
+                self._apply_refresh(*payload, job.renames)
+            elif kind in ("error", "done", "cancelled"):
+                self.refresh_job = None
+                return
 
-        self.canvas.yview_moveto(0)
+        self.root.after(SCAN_POLL_MS, self._poll_refresh, job)
 
-        self._force_canvas_refresh()
+    # -------------------------------------------------
+    # Merge a rescan into the list, keeping the selection
+    # -------------------------------------------------
+    def _apply_refresh(self, table, tree, renames):
+        old_index = self.table.row_index()
+
+        # Renamed files and folders keep their checkbox state
+        moved = {}
+        for old_rel, new_rel in renames:
+            moved[new_rel] = old_rel
+
+        def previous(rel):
+            i = old_index.get(rel)
+            if i is not None or not moved:
+                return i
+            head = rel
+            while head:
+                old_rel = moved.get(head)
+                if old_rel is not None:
+                    return old_index.get(old_rel + rel[len(head):])
+                head = head.rpartition("/")[0]
+            return None
+
+        selected = bytearray(len(table))
+        selected_count = selected_tokens = 0
+        for n, rel in enumerate(table.rels()):
+            i = previous(rel)
+            if i is not None and self.selected[i]:
+                selected[n] = 1
+                selected_count += 1
+                selected_tokens += table.tokens[n]
+
+        self.table = table
+        self.selected = selected
+        self.selected_count = selected_count
+        self.total_tokens = sum(table.tokens)
+        self.selected_tokens = selected_tokens
+        self.tree = tree
+        if self.current_page is self.pages["structure"]:
+            self._build_structure_view()
+
+        self.path_index = PathIndex()
+        if self.view is not None:
+            self.view = array("I")
+        self._index_rows()
 
+        self.update_select_all_state()
+        self._scroll_to(self.top_index)
+
+    # -------------------------------------------------
+    # Show export / structure buttons in the bottom bar
+    # -------------------------------------------------
+    def _show_footer_buttons(self):
         for w in self.bottom_bar.winfo_children():
             w.grid_forget()
 
-        # Show all footer buttons
         self.btn_export.grid(row=0, column=0, padx=5)
         self.btn_structure.grid(row=0, column=1, padx=5)
-
-        self.generate_structure_graph()
+        self.budget_label.grid(row=0, column=2, padx=(15, 2))
+        self.budget_entry.grid(row=0, column=3, padx=(0, 5))
+        self.format_box.grid(row=0, column=4, padx=5)
+        self.dedupe_check.grid(row=1, column=0, columnspan=2)
+        self.split_label.grid(row=1, column=2, padx=(15, 2))
+        self.split_entry.grid(row=1, column=3, padx=(0, 5))
+        if self.diff_ref is not None:
+            self.diff_check.config(text=f"Export diffs against {self.diff_ref}")
+            self.diff_check.grid(row=2, column=0, columnspan=5)
 
     # -------------------------------------------------
     # Show history dropdown
@@ -562,170 +1267,263 @@ class UI:
     # Update the state of "Select All" checkbox
     # -------------------------------------------------
     def update_select_all_state(self):
-        if self.file_vars and all(v.get() for v in self.file_vars):
+        if self.table and self.selected_count == len(self.table):
             self.select_all_var.set(True)
         else:
             self.select_all_var.set(False)
 
+        text = (
+            f"{self.selected_count} of {len(self.table)} selected · "
+            f"~{format_tokens(self.selected_tokens)} tokens"
+        )
+        if self.view is not None:
+            text += f" · {len(self.view)} matching"
+        self.selection_label.config(text=text)
+
     # -------------------------------------------------
     # Export selected files to a text file in Downloads
     # -------------------------------------------------
     def export_files(self):
-        if not self.files:
+        if not self.table:
             messagebox.showwarning("Warning", "No files to export!")
             return
 
-        if not any(v.get() for v in self.file_vars):
+        if not self.selected_count:
             messagebox.showwarning("No Selection", "Please select at least one file to export.")
             return
 
-        downloads = Path.home() / "Downloads" / "project_export.txt"
-        try:
-            with open(downloads, "w", encoding="utf-8") as out:
-                for path, var in zip(self.files, self.file_vars):
-                    if var.get():
-                        try:
-                            content = path.read_text(encoding="utf-8").strip()
-                            if not content:
-                                content = "empty file."
-                        except:
-                            content = "[Could not read file]"
-                        out.write(f"{path}:\n{content}\n\n")
-
-            messagebox.showinfo("Export Complete", f"Exported selected files to:\n{downloads}")
-        except Exception as e:
-            messagebox.showerror("Export Error", f"Failed to export files:\n{str(e)}")
+        if self.export_job is not None:
+            return
+
+        budget_text = self.budget_entry.get().strip().replace(",", "").replace("_", "")
+        budget = None
+        if budget_text:
+            try:
+                budget = int(budget_text)
+            except ValueError:
+                messagebox.showwarning("Token Budget", "The token budget must be a whole number.")
+                return
+
+        split_text = self.split_entry.get().strip().replace(",", "").replace("_", "")
+        split_tokens = None
+        if split_text:
+            try:
+                split_tokens = int(split_text)
+            except ValueError:
+                split_tokens = 0
+            if split_tokens <= 0:
+                messagebox.showwarning("Split Export", "The part size must be a positive whole number of tokens.")
+                return
+
+        chosen = [i for i, flag in enumerate(self.selected) if flag]
+        if budget is not None:
+            # Decide from the estimates; files that do not fit are never read
+            fits = fit_budget([self.table.tokens[i] for i in chosen], budget)
+            skipped = len(chosen) - len(fits)
+            chosen = [chosen[i] for i in fits]
+            if not chosen:
+                messagebox.showwarning("Token Budget", "None of the selected files fit into the token budget.")
+                return
+        else:
+            skipped = 0
+
+        paths = self.table.paths(chosen)
+        fmt = self.format_var.get()
+        diff_ref = self.diff_ref if self.diff_var.get() else None
+        if diff_ref is not None and fmt not in TEXT_FORMATS:
+            messagebox.showwarning("Export Diffs", f"Diffs cannot be exported as {fmt}.")
+            return
+        if split_tokens is not None and (diff_ref is not None or fmt not in TEXT_FORMATS):
+            kind = "Diff exports" if diff_ref is not None else f"{fmt} exports"
+            messagebox.showwarning("Split Export", f"{kind} cannot be split into parts.")
+            return
+        downloads = Path.home() / "Downloads" / f"project_export{OUTPUT_FORMATS[fmt]}"
+
+        for w in self.bottom_bar.winfo_children():
+            w.grid_forget()
+
+        self.export_progress.config(maximum=len(paths), value=0)
+        self.export_progress.grid(row=0, column=0, padx=5)
+        self.btn_cancel_export.grid(row=0, column=1, padx=5)
+
+        if self.read_cache is None:
+            # Only in memory unless OTTER_READ_CACHE asks for the disk tier
+            disk_dir = get_cache_dir() if disk_cache_enabled() else None
+            self.read_cache = ReadCache(disk_dir=disk_dir)
+
+        trace = new_trace("export")
+        self.export_job = BackgroundJob(
+            export_worker, paths, downloads, self.read_cache, trace,
+            fmt, self.current_folder, self.dedupe_var.get(), diff_ref,
+            split_tokens, [self.table.tokens[i] for i in chosen],
+        ).start()
+        self.export_job.skipped = skipped
+        self.export_job.trace = trace
+        self.root.after(SCAN_POLL_MS, self._poll_export, self.export_job)
+
+    # -------------------------------------------------
+    # Cancel the running export, if any
+    # -------------------------------------------------
+    def cancel_export(self):
+        job = self.export_job
+        if job is None:
+            return
+
+        job.cancel()
+        self.export_job = None
+        self._show_footer_buttons()
+
+    # -------------------------------------------------
+    # Drain export progress from the worker (runs on the Tk thread)
+    # -------------------------------------------------
+    def _poll_export(self, job):
+        if job is not self.export_job:
+            return
+
+        for kind, payload in job.drain():
+            if kind == "progress":
+                self.export_progress.config(value=payload)
+            elif kind == "result":
+                job.result = payload
+            elif kind == "error":
+                self.export_job = None
+                self._show_footer_buttons()
+                messagebox.showerror("Export Error", f"Failed to export files:\n{payload}")
+                return
+            elif kind in ("done", "cancelled"):
+                self.export_job = None
+                self._show_footer_buttons()
+                write_trace(job.trace)
+                if kind == "done":
+                    result, out_path = job.result
+                    if result.parts:
+                        message = (
+                            f"Exported selected files in {len(result.parts) - 1} part(s); "
+                            f"index:\n{result.parts[-1]}"
+                        )
+                    else:
+                        message = f"Exported selected files to:\n{out_path}"
+                    if result.truncated:
+                        message += f"\n\n{result.truncated} large file(s) were truncated."
+                    if result.duplicates:
+                        message += f"\n\n{result.duplicates} duplicate file(s) refer back to their first copy."
+                    if job.skipped:
+                        message += f"\n\n{job.skipped} selected file(s) did not fit the token budget."
+                    message += f"\n\nRead cache this session: {self.read_cache.summary()}"
+                    messagebox.showinfo("Export Complete", message)
+                return
+
+        self.root.after(SCAN_POLL_MS, self._poll_export, job)
 
     # -------------------------------------------------
     # Toggle all checkboxes on/off
     # -------------------------------------------------
     def toggle_select_all(self):
-        state = self.select_all_var.get()
-        for v in self.file_vars:
-            v.set(state)
+        state = 1 if self.select_all_var.get() else 0
+        self.selected = bytearray([state]) * len(self.table)
+        self.selected_count = state * len(self.table)
+        self.selected_tokens = state * self.total_tokens
+        self._render_rows()
+        self.update_select_all_state()
 
     # -------------------------------------------------
     # Invert selection for all checkboxes
     # -------------------------------------------------
     def do_invert(self):
-        for v in self.file_vars:
-            v.set(not v.get())
+        self.selected = bytearray(self.selected.translate(INVERT_TABLE))
+        self.selected_count = len(self.table) - self.selected_count
+        self.selected_tokens = self.total_tokens - self.selected_tokens
+        self._render_rows()
         self.update_select_all_state()
 
     # -------------------------------------------------
-    # Generate a textual tree-like representation of the project
+    # Structure page: folders are filled in when first expanded
     # -------------------------------------------------
-    def generate_structure_graph(self):
-        if not self.current_folder:
+    def _clear_structure_view(self):
+        view = self.structure_view
+        view.delete(*view.get_children())
+        self.structure_tree = None
+        self.tree_items = {}
+        self.tree_more = {}
+
+    def _build_structure_view(self):
+        self._clear_structure_view()
+        if self.tree is None:
             return
-
-        root = self.current_folder
-
-        gitignore = root / ".gitignore"
-        patterns = []
-        if gitignore.exists():
-            for line in gitignore.read_text(encoding="utf-8").splitlines():
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                patterns.append(line)
-
-        # Basic default ignore rules
-        def default_ignore(name: str):
-            if name.startswith("."):
-                return True
-            bad = [
-                "build", "dist", "target", "__pycache__", "node_modules",
-                "venv", ".venv", "env", "out", ".cache", ".mypy_cache",
-                ".pytest_cache", ".gradle", ".cargo", "Pods", ".dart_tool",
-            ]
-            return name in bad
-
-        # Check if file/dir should be excluded
-        def ignored(path: Path):
-            try:
-                rel = str(path.relative_to(root))
-            except ValueError:
-                return False
-            for p in patterns:
-                if p.endswith("/") and rel.startswith(p.rstrip("/")):
-                    return True
-                if "*" in p and fnmatch(rel, p):
-                    return True
-                if rel == p:
-                    return True
-            return False
-
-        tree_lines = []
-
-        # Recursively collect directory items
-        def collect_items(path: Path, prefix: str = ""):
-            try:
-                items = sorted(path.iterdir(), key=lambda p: p.name.lower())
-            except (PermissionError, OSError):
-                return
-
-            filtered_items = []
-            for item in items:
-                if ignored(item) or default_ignore(item.name):
-                    continue
-                filtered_items.append(item)
-
-            for i, item in enumerate(filtered_items):
-                is_last = (i == len(filtered_items) - 1)
-                if is_last:
-                    line_prefix = prefix + "└── "
-                    next_prefix = prefix + "    "
-                else:
-                    line_prefix = prefix + "├── "
-                    next_prefix = prefix + "│   "
-
-                tree_lines.append(f"{line_prefix}{item.name}")
-
-                if item.is_dir():
-                    collect_items(item, next_prefix)
-
-        # Handle root-level items
-        root_items = []
-        for item in sorted(root.iterdir(), key=lambda p: p.name.lower()):
-            if ignored(item) or default_ignore(item.name):
-                continue
-            root_items.append(item)
-
-        for i, item in enumerate(root_items):
-            is_last = (i == len(root_items) - 1)
-
-            if is_last:
-                prefix = "└── "
-                next_prefix = "    "
-            else:
-                prefix = "├── "
-                next_prefix = "│   "
-
-            tree_lines.append(f"{prefix}{item.name}")
-
-            if item.is_dir():
-                collect_items(item, next_prefix)
-
-        text = "\n".join(tree_lines)
-
-        self.structure_text.configure(state="normal")
-        self.structure_text.delete("1.0", "end")
-        self.structure_text.insert("1.0", text)
-        self.structure_text.configure(state="disabled")
+        self.structure_tree = self.tree
+        self._insert_children("", self.tree)
+
+    def _insert_children(self, parent, node, start=0):
+        view = self.structure_view
+        items = sorted_children(node)
+        end = min(len(items), start + TREE_BATCH)
+        for name, child in items[start:end]:
+            item = view.insert(parent, "end", text=name)
+            if child is not None:
+                self.tree_items[item] = child
+                if child.dirs or child.files or child.extras:
+                    view.insert(item, "end", text="")  # placeholder: makes it expandable
+        if end < len(items):
+            more = view.insert(
+                parent, "end", text=f"… {len(items) - end} more (double-click to show)"
+            )
+            self.tree_more[more] = (node, end)
+
+    def _on_tree_open(self, event=None):
+        view = self.structure_view
+        item = view.focus()
+        node = self.tree_items.pop(item, None)
+        if node is None:
+            return  # already filled in
+        view.delete(*view.get_children(item))
+        self._insert_children(item, node)
+
+    def _on_tree_double_click(self, event):
+        view = self.structure_view
+        item = view.identify_row(event.y)
+        entry = self.tree_more.pop(item, None)
+        if entry is None:
+            return
+        parent = view.parent(item)
+        view.delete(item)
+        self._insert_children(parent, *entry)
 
     # -------------------------------------------------
-    # Copy structure output to clipboard
+    # Copy the ASCII structure to the clipboard, a chunk per Tk tick
     # -------------------------------------------------
     def copy_structure_graph(self):
-        content = self.structure_text.get("1.0", "end-1c")
-        if not content.strip():
+        if self.tree is None or self.copy_job is not None:
             return
 
+        def limit(spinbox):
+            try:
+                value = int(spinbox.get())
+            except ValueError:
+                return None
+            return value if value > 0 else None
+
+        lines = iter_structure(self.tree, limit(self.copy_depth), limit(self.copy_entries))
         self.root.clipboard_clear()
-        self.root.clipboard_append(content)
+        self.copy_btn.config(text="Copying…", state="disabled")
+        self.copy_job = lines
+        self.root.after(0, self._copy_chunk, lines, True)
+
+    def _copy_chunk(self, lines, first):
+        if lines is not self.copy_job:
+            return
+        chunk = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= COPY_CHUNK_LINES:
+                break
+        if chunk:
+            self.root.clipboard_append(("" if first else "\n") + "\n".join(chunk))
+        if len(chunk) >= COPY_CHUNK_LINES:
+            self.root.after(0, self._copy_chunk, lines, False)
+            return
 
-        self.copy_btn.config(text="Copied!", state="disabled")
+        self.copy_job = None
+        self.copy_btn.config(text="Copied!")
 
         def restore_button():
             self.copy_btn.config(text="Copy", state="normal")
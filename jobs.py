@@ -0,0 +1,67 @@
+import queue
+import threading
+
+# --- Background jobs --- #
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled."""
+
+
+class BackgroundJob:
+    """
+    Run a worker function on a daemon thread.
+    The worker talks to the GUI only through `post`; the GUI drains
+    messages from the Tk thread (via `root.after`), so no Tk call ever
+    happens off the main thread.
+    """
+
+    def __init__(self, target, *args):
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.finished = False
+        self._thread = threading.Thread(
+            target=self._run, args=(target, args), daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancel() was requested."""
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def post(self, kind: str, payload=None):
+        """Send a message from the worker to the GUI."""
+        self.messages.put((kind, payload))
+
+    def drain(self, limit: int = 50):
+        """Return up to `limit` pending messages without blocking."""
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(self.messages.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self, target, args):
+        try:
+            target(self, *args)
+        except JobCancelled:
+            self.post("cancelled")
+        except Exception as e:
+            self.post("error", e)
+        else:
+            if self.cancel_event.is_set():
+                self.post("cancelled")
+            else:
+                self.post("done")
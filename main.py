@@ -1,4 +1,16 @@
-from gui import launch_app
+import sys
 
 if __name__ == "__main__":
+    # Batch export and content search start worker processes; needed for
+    # the PyInstaller builds only, and importing multiprocessing slows
+    # down every start
+    if getattr(sys, "frozen", False):
+        from multiprocessing import freeze_support
+        freeze_support()
+    # Any arguments select the headless command line; Tk is never imported
+    if len(sys.argv) > 1:
+        from cli import main
+        sys.exit(main())
+
+    from gui import launch_app
     launch_app()
@@ -0,0 +1,181 @@
+import re
+from array import array
+from itertools import compress
+from gitignore import translate_pattern
+
+# --- Path search index --- #
+
+MODES = ("substring", "fuzzy", "glob")
+# Splits a glob into the literal runs every match must contain
+_GLOB_SPECIAL = re.compile(r"\*+|\?|\[[^\]]*\]?")
+
+def _glob_matcher(pattern: str):
+    """
+    (literal, regex) for a gitignore-style glob containing "/": it is
+    matched against the whole path, and a folder matches everything
+    below it. `literal` is the longest plain run of the pattern; paths
+    without it are rejected before the regex runs.
+    """
+    regex = re.compile(f"(?:{translate_pattern(pattern)})(?:/.*)?", re.DOTALL)
+    literal = ""
+    if "\\" not in pattern:
+        pieces = (piece.lstrip("/") for piece in _GLOB_SPECIAL.split(pattern))
+        literal = max(pieces, key=len, default="")
+    return literal, regex
+
+def _fuzzy_regex(term: str):
+    """Regex finding the characters of `term` in order (no backtracking)."""
+    parts = []
+    for c in term:
+        escaped = re.escape(c)
+        if parts:
+            # [^c]*c jumps straight to the next c
+            parts.append(f"[^{escaped}]*")
+        parts.append(escaped)
+    return re.compile("".join(parts))
+
+def _is_subsequence(short: str, long: str) -> bool:
+    it = iter(long)
+    return all(c in it for c in short)
+
+class PathIndex:
+    """
+    Lowercased relative paths of the scanned files, for filtering the
+    list as the user types. Space-separated terms must all match. Each
+    search remembers its result, and when the next query only narrows
+    the previous one (typing on, or adding a term), just that result is
+    searched again. Globs without "/" are matched against the distinct
+    file and folder names, all at once, instead of against every path.
+    """
+
+    def __init__(self):
+        self.paths = []
+        self._last = None  # (mode, terms, result) of the previous search
+        # Distinct file and folder names; "/"-joined for name globs
+        self._names = {}
+        self._blob = None
+        # Paths by file name id, and by the id of the folder holding them
+        self._name_paths = []
+        self._dir_paths = [array("I")]
+        # Folders (the root first): name id (-1 for the root) and parent
+        self._dir_ids = {"": 0}
+        self._dir_name = array("i", [-1])
+        self._dir_parent = array("i", [-1])
+
+    def __len__(self):
+        return len(self.paths)
+
+    def add(self, rel_paths):
+        start = len(self.paths)
+        self.paths.extend(p.lower() for p in rel_paths)
+        for i in range(start, len(self.paths)):
+            folder, _, name = self.paths[i].rpartition("/")
+            self._name_paths[self._name_id(name)].append(i)
+            self._dir_paths[self._dir_id(folder)].append(i)
+        self._last = None
+
+    def _name_id(self, name: str) -> int:
+        i = self._names.get(name)
+        if i is None:
+            i = self._names[name] = len(self._name_paths)
+            self._name_paths.append(array("I"))
+            self._blob = None
+        return i
+
+    def _dir_id(self, folder: str) -> int:
+        i = self._dir_ids.get(folder)
+        if i is None:
+            parent, _, name = folder.rpartition("/")
+            # Parents get lower ids than their children
+            parent_id = self._dir_id(parent)
+            i = self._dir_ids[folder] = len(self._dir_name)
+            self._dir_name.append(self._name_id(name))
+            self._dir_parent.append(parent_id)
+            self._dir_paths.append(array("I"))
+        return i
+
+    def search(self, query: str, mode: str = "substring", start: int = 0):
+        """
+        Return an array of indexes (in list order, from `start` on) of
+        the paths matching `query`. An empty query matches nothing.
+        """
+        terms = query.lower().split()
+        if not terms:
+            return array("I")
+        if mode not in MODES:
+            raise ValueError(f"unknown filter mode: {mode!r}")
+
+        candidates = None
+        if start == 0 and self._last is not None and self._refines(mode, terms):
+            candidates = self._last[2]
+        if candidates is None:
+            candidates = range(start, len(self.paths))
+
+        paths = self.paths
+        for term in terms:
+            if not candidates:
+                break
+            if mode == "substring":
+                candidates = [i for i in candidates if term in paths[i]]
+                continue
+            if mode == "glob":
+                term = term.rstrip("/")
+                if not term.strip("*"):
+                    # Every path has a name that "*" matches
+                    continue
+                if "/" not in term:
+                    candidates = self._match_names(term, candidates)
+                    continue
+                literal, regex = _glob_matcher(term)
+                if literal:
+                    candidates = [i for i in candidates if literal in paths[i]]
+                test = regex.fullmatch
+            elif len(term) == 1:
+                candidates = [i for i in candidates if term in paths[i]]
+                continue
+            else:
+                test = _fuzzy_regex(term).search
+            candidates = list(compress(candidates, map(test, (paths[i] for i in candidates))))
+
+        result = array("I", candidates)
+        if start == 0:
+            self._last = (mode, terms, result)
+        return result
+
+    def _match_names(self, pattern: str, candidates):
+        """
+        The candidates (in order) whose file name, or a folder on whose
+        path, matches the glob `pattern` (which has no "/").
+        """
+        if self._blob is None:
+            self._blob = "/" + "/".join(self._names) + "/"
+        regex = re.compile(f"/({translate_pattern('/' + pattern)})(?=/)", re.DOTALL)
+        # findall scans all names in one go; a name can hold no "/"
+        matched = set(map(self._names.__getitem__, regex.findall(self._blob)))
+
+        found = set().union(*map(self._name_paths.__getitem__, matched))
+        folders = bytearray(len(self._dir_name))
+        parents, folder_names = self._dir_parent, self._dir_name
+        for k in range(1, len(folders)):
+            if folders[parents[k]] or folder_names[k] in matched:
+                folders[k] = 1
+                found.update(self._dir_paths[k])
+
+        if not (isinstance(candidates, range) and candidates.stop == len(self.paths)):
+            found.intersection_update(candidates)
+        elif candidates.start:
+            found = {i for i in found if i >= candidates.start}
+        return sorted(found)
+
+    def _refines(self, mode, terms) -> bool:
+        """True if everything matching `terms` also matched the last query."""
+        last_mode, last_terms, _ = self._last
+        if mode != last_mode:
+            return False
+        if mode == "substring":
+            return all(any(old in new for new in terms) for old in last_terms)
+        if mode == "fuzzy":
+            return all(any(_is_subsequence(old, new) for new in terms) for old in last_terms)
+        # Globs: kept or added terms narrow the result; a term of only
+        # "*" matched every path
+        return all(old in terms or not old.strip("*") for old in last_terms)
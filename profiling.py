@@ -0,0 +1,149 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from appdata import get_app_dir
+
+# --- Opt-in switches --- #
+
+# "1" writes traces to the default folder; any other value is a folder path
+ENV_TRACE = "OTTER_TRACE"
+# "1" captures a cProfile of the next scan (once per process)
+ENV_PROFILE = "OTTER_PROFILE"
+
+def get_trace_dir(app_name="Otter") -> Path:
+    """Folder for trace and profile files (OTTER_TRACE may override it)."""
+    value = os.environ.get(ENV_TRACE, "")
+    if value and value != "1":
+        trace_dir = Path(value).expanduser()
+    else:
+        trace_dir = get_app_dir() / f"{app_name}_traces"
+    trace_dir.mkdir(parents=True, exist_ok=True)
+    return trace_dir
+
+def tracing_enabled() -> bool:
+    return bool(os.environ.get(ENV_TRACE))
+
+# --- Traces --- #
+
+class Trace:
+    """Per-stage wall times and named counters for one scan or export."""
+
+    enabled = True
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.time()
+        self.stages = {}
+        self.counters = {}
+        self.info = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float):
+        with self._lock:
+            total, calls = self.stages.get(name, (0.0, 0))
+            self.stages[name] = (total + seconds, calls + 1)
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "started": self.started,
+                "seconds": time.time() - self.started,
+                "stages": {
+                    name: {"seconds": total, "calls": calls}
+                    for name, (total, calls) in self.stages.items()
+                },
+                "counters": dict(self.counters),
+                "info": dict(self.info),
+            }
+
+    def write(self, path=None) -> Path:
+        """Write the trace as JSON (default: a timestamped file in the trace folder)."""
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+            path = get_trace_dir() / f"{self.name}-{stamp}.json"
+        path = Path(path)
+        path.write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
+        return path
+
+
+class NullTrace:
+    """Stand-in used when tracing is off; every call is a no-op."""
+
+    enabled = False
+    _context = nullcontext()
+
+    @property
+    def info(self) -> dict:
+        # A fresh throwaway dict, so callers may fill it in unconditionally
+        return {}
+
+    def stage(self, name):
+        return self._context
+
+    def add_time(self, name, seconds):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def write(self, path=None):
+        return None
+
+
+NULL_TRACE = NullTrace()
+
+def new_trace(name: str):
+    """A Trace when OTTER_TRACE is set, otherwise the shared NullTrace."""
+    return Trace(name) if tracing_enabled() else NULL_TRACE
+
+# --- cProfile capture --- #
+
+_profile_taken = False
+_profile_lock = threading.Lock()
+
+def take_profile_request() -> bool:
+    """True once per process if OTTER_PROFILE asks for a profile."""
+    global _profile_taken
+    with _profile_lock:
+        if _profile_taken or not os.environ.get(ENV_PROFILE):
+            return False
+        _profile_taken = True
+        return True
+
+@contextmanager
+def profiled(enabled: bool, name: str, path=None):
+    """
+    Run the block under cProfile (current thread only) and dump stats to
+    `path` or a timestamped .prof file in the trace folder.
+    """
+    if not enabled:
+        yield None
+        return
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = get_trace_dir() / f"{name}-{stamp}.prof"
+        profile.dump_stats(str(path))
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from appdata import get_app_dir
+
+# --- Cache limits --- #
+
+MAX_MEMORY_BYTES = 64 * 1024 * 1024
+MAX_DISK_BYTES = 256 * 1024 * 1024
+# When the disk tier is over its limit, evict down to this fraction
+DISK_TRIM_RATIO = 0.8
+
+# Opt-in switch for the GUI's on-disk tier ("1" turns it on); the command
+# line asks for it with --read-cache
+ENV_DISK_CACHE = "OTTER_READ_CACHE"
+
+def disk_cache_enabled() -> bool:
+    return os.environ.get(ENV_DISK_CACHE, "") not in ("", "0")
+
+def get_cache_dir(app_name="Otter") -> Path:
+    """Folder for the on-disk tier, next to the history file."""
+    cache_dir = get_app_dir() / f"{app_name}_read_cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+def entry_key(path, st, *options) -> str:
+    """Cache key for a file: path + size + mtime_ns (+ export options)."""
+    return "\0".join(map(str, (path, st.st_size, st.st_mtime_ns) + options))
+
+# --- Two-tier LRU cache --- #
+
+class ReadCache:
+    """
+    LRU cache of rendered export entries. Values are (text, bytes read,
+    truncated, failed) tuples. A memory tier is bounded by
+    `max_memory_bytes`; an optional disk tier in `disk_dir` is bounded by
+    `max_disk_bytes`. Safe to use from the exporter's reader threads.
+    """
+
+    def __init__(self, max_memory_bytes=MAX_MEMORY_BYTES, disk_dir=None,
+                 max_disk_bytes=MAX_DISK_BYTES):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = None  # measured on first write
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._memory_put(key, value)
+        return value
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_bytes": self._memory_bytes,
+            "memory_entries": len(self._memory),
+        }
+
+    def summary(self) -> str:
+        return (
+            f"{self.hits + self.disk_hits} hits "
+            f"({self.disk_hits} from disk), {self.misses} misses"
+        )
+
+    # --- memory tier (caller holds the lock) --- #
+
+    def _memory_put(self, key, value):
+        size = len(value[0])
+        if size > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old[0])
+        self._memory[key] = value
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted[0])
+
+    # --- disk tier --- #
+
+    def _disk_path(self, key):
+        name = hashlib.sha1(key.encode("utf-8", "surrogatepass")).hexdigest()
+        return self.disk_dir / f"{name}.txt"
+
+    def _disk_get(self, key):
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                header = f.readline().split()
+                text = f.read()
+            os.utime(path)  # mark as recently used
+            read, truncated, failed = map(int, header)
+        except (OSError, ValueError):
+            return None
+        return text, read, bool(truncated), bool(failed)
+
+    def _disk_put(self, key, value):
+        if self.disk_dir is None:
+            return
+        text, read, truncated, failed = value
+        path = self._disk_path(key)
+        # Batch exports share the folder between processes
+        tmp = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8", newline="") as f:
+                f.write(f"{read} {int(truncated)} {int(failed)}\n")
+                f.write(text)
+            os.replace(tmp, path)
+            size = path.stat().st_size
+        except OSError:
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._measure_disk()
+            else:
+                self._disk_bytes += size
+            over = self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._trim_disk()
+
+    def _measure_disk(self):
+        total = 0
+        for entry in os.scandir(self.disk_dir):
+            try:
+                total += entry.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _trim_disk(self):
+        """Delete least recently used disk entries down to DISK_TRIM_RATIO."""
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * DISK_TRIM_RATIO
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+
+        with self._lock:
+            self._disk_bytes = total
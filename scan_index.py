@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from appdata import get_app_dir
+
+# --- Index limits --- #
+
+INDEX_VERSION = 5
+MAX_INDEX_PROJECTS = 20
+MAX_INDEX_BYTES = 64 * 1024 * 1024
+# Directories modified this recently may still change within the same
+# mtime tick, so their listing is stored but never trusted on reload.
+RACY_WINDOW_NS = 2_000_000_000
+
+def get_index_dir(app_name="Otter") -> Path:
+    """Folder holding one index file per project, next to the history file."""
+    index_dir = get_app_dir() / f"{app_name}_scan_index"
+    index_dir.mkdir(parents=True, exist_ok=True)
+    return index_dir
+
+def evict_indexes(index_dir: Path, max_projects=MAX_INDEX_PROJECTS, max_bytes=MAX_INDEX_BYTES):
+    """Delete least recently used project indexes until within bounds."""
+    entries = []
+    for p in index_dir.glob("*.json"):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+
+    entries.sort(reverse=True)  # most recently used first
+    total = 0
+    for count, (_, size, p) in enumerate(entries, 1):
+        total += size
+        if count > max_projects or total > max_bytes:
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+# --- Per-project index --- #
+
+class ScanIndex:
+    """
+    On-disk record of each scanned directory's mtime/inode and its
+    listing (walked subdirectories, accepted files, other visible files)
+    for one project root.
+    A directory whose mtime, inode and .gitignore mtime are unchanged is
+    not listed again on the next scan.
+    """
+
+    def __init__(self, root: Path, index_dir: Path = None):
+        self.root = Path(root).resolve()
+        self.index_dir = index_dir or get_index_dir()
+        key = hashlib.sha1(self.root.as_posix().encode("utf-8")).hexdigest()
+        self.path = self.index_dir / f"{key}.json"
+        self.rules = None
+        self.dirs = {}
+        # rel file -> [size, mtime_ns, is_text, tokens], shared with a SniffCache
+        self.sniff = {}
+        self._seen = set()
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, rules: str):
+        """Load the stored index; drop it if the filter rules changed."""
+        self.rules = rules
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if (
+            data.get("version") == INDEX_VERSION
+            and data.get("root") == self.root.as_posix()
+            and data.get("rules") == rules
+        ):
+            self.dirs = data.get("dirs", {})
+            self.sniff.update(data.get("sniff", {}))
+
+    def lookup(self, rel_dir: str, st, gitignore_mtime: int, force=False):
+        """Return (subdirs, files, extras) if the cached listing is still valid."""
+        self._seen.add(rel_dir)
+        entry = None if force else self.dirs.get(rel_dir)
+        if (
+            entry
+            and entry[0] == st.st_mtime_ns
+            and entry[1] == st.st_ino
+            and entry[2] == gitignore_mtime
+        ):
+            self.hits += 1
+            return entry[3], entry[4], entry[5]
+        self.misses += 1
+        return None
+
+    def gitignore_changed(self, rel_dir: str, gitignore_mtime: int) -> bool:
+        """True if a previously indexed directory's .gitignore changed."""
+        entry = self.dirs.get(rel_dir)
+        return entry is not None and entry[2] != gitignore_mtime
+
+    def store(self, rel_dir: str, st, gitignore_mtime: int, subdirs, files, extras):
+        mtime = st.st_mtime_ns
+        if time.time_ns() - mtime < RACY_WINDOW_NS:
+            mtime = 0
+        self.dirs[rel_dir] = [mtime, st.st_ino, gitignore_mtime, subdirs, files, extras]
+        self.dirty = True
+
+    def keep_listings(self):
+        """Keep every stored listing on save, for scans that do not walk."""
+        self._seen.update(self.dirs)
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    def save(self):
+        """Write the index (dropping directories no longer reached) and evict old ones."""
+        stale = self.dirs.keys() - self._seen
+        if stale:
+            for rel_dir in stale:
+                del self.dirs[rel_dir]
+            self.dirty = True
+
+        if self.dirty:
+            data = {
+                "version": INDEX_VERSION,
+                "root": self.root.as_posix(),
+                "rules": self.rules,
+                "dirs": self.dirs,
+                "sniff": self.sniff,
+            }
+            # Two processes exporting the same root must not share a temp file
+            tmp = self.path.with_name(f"{self.path.stem}.{os.getpid()}-{threading.get_ident()}.tmp")
+            try:
+                tmp.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8")
+                os.replace(tmp, self.path)
+            except OSError:
+                try:
+                    tmp.unlink()
+                except OSError:
+                    pass
+                return
+            self.dirty = False
+        else:
+            # Mark as recently used for LRU eviction
+            try:
+                os.utime(self.path)
+            except OSError:
+                pass
+
+        evict_indexes(self.index_dir)
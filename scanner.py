@@ -1,5 +1,13 @@
+import hashlib
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from git_index import tracked_files, tracked_listings
+from gitignore import GitIgnore
+from profiling import NULL_TRACE
+from sniffer import SniffCache, SNIFF_BYTES
+from tokens import estimate_from_size
 
 # --- Ignore rules --- #
 
@@ -36,81 +44,391 @@ SKIP_EXTS = {
 
 def should_skip_file(path: Path) -> bool:
     """Return True if a file should be excluded."""
-    if path.name in SKIP_FILES:
-        return True
-    if path.suffix.lower() in SKIP_EXTS:
-        return True
-    return False
+    return skip_reason(path) is not None
+
+def skip_reason(path: Path):
+    """Name of the rule that excludes a file ("skip_files"/"skip_exts"), or None."""
+    return name_skip_reason(path.name)
+
+def name_skip_reason(name: str):
+    """skip_reason() for a bare file name, without building a Path."""
+    if name in SKIP_FILES:
+        return "skip_files"
+    if os.path.splitext(name)[1].lower() in SKIP_EXTS:
+        return "skip_exts"
+    return None
 
 def should_prune_dir(dirname: str) -> bool:
     """Return True if a directory should not be scanned."""
     return dirname in SKIP_DIRS
 
-# --- Gitignore support --- #
+class ContentFilter:
+    """
+    Checks applied to files that pass the name rules: an optional size
+    limit and a binary-content sniff of the first few KB, which also
+    yields a token estimate. Results are cached per (path, size, mtime).
+    """
 
-def load_gitignore_patterns(root: Path):
-    """Read .gitignore patterns and return ignored dirs + files."""
-    gitignore_path = root / ".gitignore"
-    ignored_dirs = set()
-    ignored_files = set()
+    def __init__(self, max_file_bytes=None, sniff=True, cache=None):
+        self.max_file_bytes = max_file_bytes
+        self.sniff = sniff
+        self.cache = cache if cache is not None else SniffCache()
 
-    if not gitignore_path.exists():
-        return ignored_dirs, ignored_files
+    def check(self, path: Path, key: str, trace=NULL_TRACE, entry=None):
+        """Return the file's estimated token count, or None if it is filtered out."""
+        result = self.check_stat(path, key, trace, entry)
+        return None if result is None else result[0]
 
-    try:
-        lines = gitignore_path.read_text(encoding="utf-8").splitlines()
-    except Exception:
-        return ignored_dirs, ignored_files
+    def check_stat(self, path: Path, key: str, trace=NULL_TRACE, entry=None):
+        """
+        Like check(), but return (tokens, os.stat result) for kept files.
+        With the os.DirEntry the file was listed from, its cached stat is
+        used instead of statting the path again.
+        """
+        try:
+            st = os.stat(path) if entry is None else entry.stat()
+        except OSError:
+            trace.count("files_skipped_unreadable")
+            return None
+        if self.max_file_bytes is not None and st.st_size > self.max_file_bytes:
+            trace.count("files_skipped_size")
+            return None
+        if self.sniff and st.st_size:
+            misses = self.cache.misses
+            is_text, tokens = self.cache.check(key, path, st)
+            if self.cache.misses != misses:
+                trace.count("sniff_bytes_read", min(st.st_size, SNIFF_BYTES))
+            if not is_text:
+                trace.count("files_skipped_binary")
+                return None
+            return tokens, st
+        return estimate_from_size(st.st_size), st
 
-    for line in lines:
-        line = line.strip()
-        if not line or line.startswith("#"):
-            continue
+# --- Tree model --- #
 
-        if line.startswith("/"):
-            line = line[1:]
+class DirNode:
+    """
+    One scanned directory. `dirs` are the subdirectories that were walked,
+    `files` the names that pass filters and `extras` the names that are
+    filtered out but not gitignored.
+    """
 
-        if line.endswith("/"):
-            ignored_dirs.add(line.rstrip("/"))
-            continue
+    __slots__ = ("name", "dirs", "files", "extras")
 
-        if line.startswith("*."):
-            ignored_files.add(line[1:])
-            continue
+    def __init__(self, name: str):
+        self.name = name
+        self.dirs = []
+        self.files = []
+        self.extras = []
 
-        ignored_files.add(line)
+# --- Core scanning --- #
 
-    return ignored_dirs, ignored_files
+# Threads listing directories at once; each listing is mostly waiting on
+# the filesystem, which matters most on network mounts
+WALK_WORKERS = 8
+# Where file names come from besides the walk: the git index only
+# ("tracked"), or the index plus the walk's untracked, non-ignored files
+GIT_MODES = ("tracked", "tracked+untracked")
 
-# --- Core scanning --- #
+def _mtime_ns(path: Path) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
 
-def scan_folder(root: Path):
+def rules_signature(root: Path) -> str:
+    """Fingerprint of every filter input that is not tied to one directory."""
+    h = hashlib.sha1()
+    for rules in (SKIP_DIRS, SKIP_FILES, SKIP_EXTS):
+        h.update(repr(sorted(rules)).encode("utf-8"))
+    h.update(str(_mtime_ns(root / ".git" / "info" / "exclude")).encode("ascii"))
+    return h.hexdigest()
+
+def list_dir(path: Path, prefix: str, gitignore, trace=NULL_TRACE, entries=None):
     """
-    Scan folder and return list of Path objects that pass filters.
-    GUI is responsible for displaying results.
+    List one directory and return (subdirs, files, extras): the names of
+    subdirectories to descend into, of files that pass filters, and of
+    files that are filtered out but not gitignored (structure view only).
+    All three are sorted by name. Pruned directories are never returned,
+    so nothing below them is checked again. A dict passed as `entries`
+    receives the os.DirEntry of every file, by name.
     """
-    results = []
+    listed = []
+    with trace.stage("walk"):
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        continue
+                    # Like os.walk, never follow directory symlinks
+                    if is_dir and entry.is_symlink():
+                        trace.count("dirs_pruned_symlink")
+                        continue
+                    listed.append((entry.name, is_dir))
+                    if entries is not None and not is_dir:
+                        entries[entry.name] = entry
+        except OSError:
+            trace.count("dirs_unreadable")
+    listed.sort()
 
-    gitignore_dirs, gitignore_files = load_gitignore_patterns(root)
+    subdirs, files, extras = [], [], []
+    with trace.stage("name_rules"):
+        for name, is_dir in listed:
+            if is_dir:
+                if should_prune_dir(name):
+                    trace.count("dirs_pruned_skip_dirs")
+                elif gitignore.is_ignored(prefix + name, is_dir=True):
+                    trace.count("dirs_pruned_gitignore")
+                else:
+                    subdirs.append(name)
+            elif gitignore.is_ignored(prefix + name):
+                trace.count("files_skipped_gitignore")
+            elif name in SKIP_DIRS:
+                trace.count("files_skipped_skip_dirs")
+                extras.append(name)
+            else:
+                reason = name_skip_reason(name)
+                if reason is None:
+                    files.append(name)
+                else:
+                    trace.count("files_skipped_" + reason)
+                    extras.append(name)
+    return subdirs, files, extras
+
+def tracked_dir(subdirs, names, trace=NULL_TRACE):
+    """
+    (subdirs, files, extras) for one directory of a given path list such
+    as the git index. Name rules apply as in list_dir(), gitignore does
+    not: tracked files are exported even when they match an ignore
+    pattern, as in git.
+    """
+    kept_dirs = []
+    for name in sorted(subdirs):
+        if should_prune_dir(name):
+            trace.count("dirs_pruned_skip_dirs")
+        else:
+            kept_dirs.append(name)
+    files, extras = [], []
+    for name in sorted(names):
+        reason = "skip_dirs" if name in SKIP_DIRS else name_skip_reason(name)
+        if reason is None:
+            files.append(name)
+        else:
+            trace.count("files_skipped_" + reason)
+            extras.append(name)
+    return kept_dirs, files, extras
 
-    for dirpath, dirs, files in os.walk(root):
-        dirs[:] = [
-            d for d in dirs
-            if not should_prune_dir(d) and d not in gitignore_dirs
-        ]
+def _merge_listings(a, b):
+    return tuple(sorted(set(x) | set(y)) for x, y in zip(a, b))
 
-        base = Path(dirpath)
+def iter_folder(root: Path, cancel=None, index=None, tree=None, content_filter=None,
+                with_tokens=False, trace=NULL_TRACE, workers=WALK_WORKERS, git_files=None,
+                rel_paths=None, records=False):
+    """
+    Walk folder and yield Path objects that pass filters as they are found.
+    Stops early once the optional cancel event is set. With a ScanIndex,
+    directories whose mtime is unchanged are served from the index.
+    With a DirNode for the root as `tree`, the same walk also fills in
+    the project tree model. A ContentFilter additionally drops binary
+    and oversized files. With `with_tokens`, (path, estimated tokens)
+    pairs are yielded instead (0 without a ContentFilter). With
+    `records`, no Path objects are built at all: (rel dir, name, tokens,
+    size, mtime_ns) tuples are yielded for a file_table.FileTable (size
+    and mtime are 0 without a ContentFilter). A profiling Trace collects
+    stage timings and per-rule skip counters.
 
-        for name in files:
-            p = base / name
+    Directories are listed by a pool of `workers` threads: as soon as a
+    listing is known, all of its subdirectories are queued, so the pool
+    runs ahead of the depth-first, name-sorted order results are yielded
+    in. The output is the same for any number of workers.
 
-            if should_skip_file(p):
-                continue
-            if p.name in gitignore_files or p.suffix in gitignore_files:
-                continue
-            if any(part in SKIP_DIRS for part in p.relative_to(root).parts):
+    With `git_files` (one of GIT_MODES) inside a git checkout, file names
+    are read from the git index instead: "tracked" skips the walk
+    entirely, "tracked+untracked" adds the walk's files. Outside a
+    repository (or with an unreadable index) the folder is walked as
+    usual. `rel_paths` (posix paths relative to root, e.g. the files
+    changed on a branch) likewise replaces the walk with a fixed list;
+    only those files are ever stat'ed or read.
+    """
+    if git_files is not None and git_files not in GIT_MODES:
+        raise ValueError(f"unknown git_files mode: {git_files!r}")
+    if git_files is not None and rel_paths is not None:
+        raise ValueError("git_files and rel_paths cannot be combined")
+
+    tracked = None
+    if rel_paths is not None:
+        tracked = tracked_listings(rel_paths)
+    elif git_files is not None:
+        with trace.stage("git_index"):
+            paths = tracked_files(root)
+            if paths is not None:
+                tracked = tracked_listings(paths)
+                trace.count("git_index_files", len(paths))
+        if tracked is None:
+            trace.count("git_index_unavailable")
+    walk_root = tracked is None or (rel_paths is None and git_files == "tracked+untracked")
+
+    with trace.stage("gitignore_load"):
+        gitignore = GitIgnore(root)
+    if index is not None:
+        with trace.stage("index_load"):
+            index.load(rules_signature(root))
+            if not walk_root:
+                index.keep_listings()
+        if content_filter is not None:
+            content_filter.cache = SniffCache(index.sniff)
+    index_lock = threading.Lock()
+
+    def visit(rel_dir, force, walk):
+        """
+        Return (listing, force for subdirectories, names of the walked
+        subdirectories or None for all, DirEntry objects of the listed
+        files by name) or None if the directory is gone.
+        """
+        walked = walk_dir(rel_dir, force) if walk else None
+        if tracked is None:
+            if walked is None:
+                return None
+            listing, force, entries = walked
+            return listing, force, None, entries
+        entry = tracked.get(rel_dir)
+        listing = tracked_dir(*entry, trace) if entry else ([], [], [])
+        if walked is None:
+            return listing, force, (), {}
+        # Tracked files in ignored folders are not walked: keep the walk
+        # to the folders it reached itself
+        walk_listing, force, entries = walked
+        return _merge_listings(walk_listing, listing), force, set(walk_listing[0]), entries
+
+    def walk_dir(rel_dir, force):
+        """
+        Return (listing, force for subdirectories, DirEntry objects by
+        name) or None if gone. Listings served from the index come with
+        no entries.
+        """
+        base = root / rel_dir if rel_dir else root
+        prefix = rel_dir + "/" if rel_dir else ""
+        listing = None
+        entries = {}
+        if index is not None:
+            try:
+                st = os.stat(base)
+            except OSError:
+                return None
+            gi_mtime = _mtime_ns(base / ".gitignore")
+            with index_lock:
+                force = force or index.gitignore_changed(rel_dir, gi_mtime)
+                listing = index.lookup(rel_dir, st, gi_mtime, force)
+
+        if listing is None:
+            # Ignore chains are built idempotently, so sibling threads
+            # loading a shared parent at once only repeat a little work
+            with trace.stage("gitignore_load"):
+                gitignore.load_dir(rel_dir)
+            listing = list_dir(base, prefix, gitignore, trace, entries)
+            trace.count("dirs_listed")
+            if index is not None:
+                with index_lock:
+                    index.store(rel_dir, st, gi_mtime, *listing)
+        else:
+            trace.count("dirs_from_index")
+        return listing, force, entries
+
+    # Index-only scans do no I/O per directory, so threads would not help
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 and walk_root else None
+
+    def schedule(rel_dir, force, walk):
+        if pool is None:
+            return rel_dir, None, force, walk
+        return rel_dir, pool.submit(visit, rel_dir, force, walk), force, walk
+
+    nodes = {"": tree} if tree is not None else None
+
+    # (relative dir, pending listing or None, force relisting because an
+    # ancestor .gitignore changed, list the directory on disk)
+    stack = [schedule("", False, walk_root)]
+    try:
+        while stack:
+            if cancel is not None and cancel.is_set():
+                return
+
+            rel_dir, future, force, walk = stack.pop()
+            result = visit(rel_dir, force, walk) if future is None else future.result()
+            if result is None:
                 continue
+            listing, force, walked, entries = result
+            base = root / rel_dir if rel_dir else root
+            prefix = rel_dir + "/" if rel_dir else ""
 
-            results.append(p)
+            subdirs, files, extras = listing
+            # Queue the subdirectories first so the pool lists them while
+            # this directory's files are filtered and yielded
+            children = [
+                schedule(prefix + name, force, walked is None or name in walked)
+                for name in subdirs
+            ]
 
-    return results
+            token_counts = None
+            if content_filter is not None:
+                kept, rejected, token_counts, stats = [], [], [], []
+                with trace.stage("content_filter"):
+                    for name in files:
+                        result = content_filter.check_stat(
+                            base / name, prefix + name, trace, entries.get(name))
+                        if result is None:
+                            rejected.append(name)
+                        else:
+                            kept.append(name)
+                            token_counts.append(result[0])
+                            stats.append(result[1])
+                if rejected:
+                    extras = sorted(extras + rejected)
+                files = kept
+
+            if nodes is not None:
+                node = nodes.pop(rel_dir)
+                node.files = files
+                node.extras = extras
+                for name in subdirs:
+                    child = DirNode(name)
+                    node.dirs.append(child)
+                    nodes[prefix + name] = child
+
+            trace.count("files_kept", len(files))
+            if records:
+                if token_counts is None:
+                    for name in files:
+                        yield rel_dir, name, 0, 0, 0
+                else:
+                    for name, tokens, st in zip(files, token_counts, stats):
+                        yield rel_dir, name, tokens, st.st_size, st.st_mtime_ns
+            elif with_tokens:
+                for i, name in enumerate(files):
+                    yield base / name, token_counts[i] if token_counts else 0
+            else:
+                for name in files:
+                    yield base / name
+
+            # Reversed so directories are visited in name order
+            stack.extend(reversed(children))
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    if index is not None:
+        if content_filter is not None:
+            cache = content_filter.cache
+            # Verdicts are only known stale after a walk of the whole tree
+            if (walk_root and cache.prune()) or cache.misses:
+                index.mark_dirty()
+        with trace.stage("index_save"):
+            index.save()
+
+def scan_folder(root: Path):
+    """
+    Scan folder and return list of Path objects that pass filters.
+    GUI is responsible for displaying results.
+    """
+    return list(iter_folder(root))
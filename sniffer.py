@@ -0,0 +1,115 @@
+import codecs
+from tokens import estimate_tokens
+
+# --- Content sniffing --- #
+
+# Bytes read from the start of a file to decide text vs. binary
+SNIFF_BYTES = 8192
+
+# Signatures of common binary formats whose first bytes may not contain NULs
+MAGIC_NUMBERS = (
+    b"\x7fELF",                 # ELF executables / shared objects
+    b"\xca\xfe\xba\xbe",        # Mach-O fat binary / Java class
+    b"\xcf\xfa\xed\xfe",        # Mach-O 64-bit
+    b"\xfe\xed\xfa",            # Mach-O
+    b"\x00asm",                 # WebAssembly
+    b"SQLite format 3\x00",     # SQLite database
+    b"%PDF-",                   # PDF
+    b"\x89PNG\r\n\x1a\n",       # PNG
+    b"GIF87a", b"GIF89a",       # GIF
+    b"\xff\xd8\xff",            # JPEG
+    b"PK\x03\x04",              # zip, jar, docx, apk, ...
+    b"\x1f\x8b",                # gzip
+    b"\x28\xb5\x2f\xfd",        # zstd
+    b"7z\xbc\xaf\x27\x1c",      # 7-Zip
+    b"Rar!\x1a\x07",            # RAR
+    b"\xfd7zXZ\x00",            # xz
+    b"OggS",                    # Ogg
+    b"fLaC",                    # FLAC
+    b"wOFF", b"wOF2",           # web fonts
+)
+
+# Longest BOMs first: the UTF-32 LE BOM starts with the UTF-16 LE one
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+def bom_encoding(head: bytes):
+    """Return the codec named by a byte order mark, or None."""
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    return None
+
+def looks_like_text(head: bytes, complete: bool = False) -> bool:
+    """
+    Decide from a file prefix whether the file is readable text.
+    `complete` means `head` is the whole file.
+    """
+    if not head or bom_encoding(head):
+        return True
+    if head.startswith(MAGIC_NUMBERS):
+        return False
+    if b"\x00" in head:
+        return False
+    # Unless this is the whole file, a multi-byte character cut off at
+    # the end of the prefix is fine
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=complete)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def sniff_file(path, size: int = None):
+    """
+    Return (looks like text, estimated tokens) for the file at `path`.
+    The token estimate comes from the same prefix read, so it is free.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError:
+        return False, 0
+    if not looks_like_text(head, complete=len(head) < SNIFF_BYTES):
+        return False, 0
+    return True, estimate_tokens(head, size)
+
+# --- Verdict cache --- #
+
+class SniffCache:
+    """
+    Text/binary verdicts and token estimates keyed by path and validated
+    against the file's size and mtime, so unchanged files are never read
+    twice. `entries` may be shared with a ScanIndex to persist them
+    between runs.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = {} if entries is None else entries
+        self.seen = set()
+        self.hits = 0
+        self.misses = 0
+
+    def check(self, key: str, path, st):
+        """Return (looks like text, estimated tokens) for one file."""
+        self.seen.add(key)
+        entry = self.entries.get(key)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            self.hits += 1
+            return entry[2], entry[3]
+
+        self.misses += 1
+        is_text, tokens = sniff_file(path, st.st_size)
+        self.entries[key] = [st.st_size, st.st_mtime_ns, is_text, tokens]
+        return is_text, tokens
+
+    def prune(self) -> int:
+        """Forget verdicts for files not looked up since this cache was created."""
+        stale = self.entries.keys() - self.seen
+        for key in stale:
+            del self.entries[key]
+        return len(stale)
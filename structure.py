@@ -0,0 +1,57 @@
+from itertools import chain
+
+# --- Display rules --- #
+
+# Directories hidden from the structure view even when they are scanned
+STRUCTURE_HIDDEN = {
+    "build", "dist", "target", "__pycache__", "node_modules",
+    "venv", ".venv", "env", "out", ".cache", ".mypy_cache",
+    ".pytest_cache", ".gradle", ".cargo", "Pods", ".dart_tool",
+}
+
+def is_hidden(name: str) -> bool:
+    """Return True if an entry should not appear in the structure view."""
+    return name.startswith(".") or name in STRUCTURE_HIDDEN
+
+# --- Rendering --- #
+
+def sorted_children(node):
+    """Visible (name, DirNode or None for files) pairs of a node, sorted by name."""
+    items = [(d.name, d) for d in node.dirs if not is_hidden(d.name)]
+    items.extend(
+        (name, None) for name in chain(node.files, node.extras)
+        if not is_hidden(name)
+    )
+    items.sort(key=lambda item: item[0].lower())
+    return items
+
+def iter_structure(tree, max_depth=None, max_entries=None):
+    """
+    Yield the lines of the ASCII tree for a scanned DirNode (root
+    excluded) one at a time, so huge trees never exist as one string.
+    Folders deeper than `max_depth` are listed without their contents;
+    at most `max_entries` entries are listed per folder, followed by a
+    "… N more" line.
+    """
+    # (sorted items, position, prefix, depth) per open folder
+    stack = [(sorted_children(tree), 0, "", 1)]
+    while stack:
+        items, i, prefix, depth = stack.pop()
+        limit = len(items) if max_entries is None else min(len(items), max_entries)
+        if i >= limit:
+            if limit < len(items):
+                yield f"{prefix}└── … {len(items) - limit} more"
+            continue
+
+        name, child = items[i]
+        is_last = i == len(items) - 1
+        yield f"{prefix}{'└── ' if is_last else '├── '}{name}"
+        stack.append((items, i + 1, prefix, depth))
+
+        if child is not None and (max_depth is None or depth < max_depth):
+            next_prefix = prefix + ("    " if is_last else "│   ")
+            stack.append((sorted_children(child), 0, next_prefix, depth + 1))
+
+def render_structure(tree, max_depth=None, max_entries=None) -> str:
+    """Render a scanned DirNode tree as an ASCII tree (root excluded)."""
+    return "\n".join(iter_structure(tree, max_depth, max_entries))
@@ -0,0 +1,103 @@
+import io
+import json
+import threading
+
+import pytest
+
+from exporter import PREFETCH_MAX_BYTES, export_files, split_export, write_export, write_jsonl
+from read_cache import ReadCache
+
+SAMPLES = {
+    "crlf.txt": b"line1\r\nline2\r\n",
+    "cr.txt": b"line1\rline2\r",
+    "mixed.txt": b"  a\r\nb\rc\n\r\n",
+    "unicode.txt": "  héllo wörld 😀\n".encode("utf-8"),
+    "bom.txt": b"\xef\xbb\xbfwith bom\r\n",
+    "empty.txt": b"",
+    "blank.txt": b" \r\n\t\n",
+}
+
+def baseline_entry(path):
+    """An entry as the original exporter wrote it."""
+    try:
+        content = path.read_text(encoding="utf-8-sig").strip()
+        if not content:
+            content = "empty file."
+    except (OSError, UnicodeDecodeError):
+        content = "[Could not read file]"
+    return f"{path}:\n{content}\n\n"
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for name, data in SAMPLES.items():
+        path = tmp_path / name
+        path.write_bytes(data)
+        paths.append(path)
+    return paths
+
+@pytest.mark.parametrize("workers", [1, 8])
+def test_text_export_matches_baseline(files, workers):
+    out = io.StringIO()
+    write_export(out, files, workers=workers)
+    assert out.getvalue() == "".join(baseline_entry(path) for path in files)
+
+@pytest.mark.parametrize("workers", [1, 8])
+def test_streamed_files_match_baseline(tmp_path, workers):
+    # Above the prefetch limit, so written in chunks; some "\r\n" pairs
+    # straddle a chunk boundary
+    paths = []
+    for name, line in (("big_crlf.txt", "x" * 1023 + "\r\n"), ("big_cr.txt", "é" * 511 + "\r")):
+        path = tmp_path / name
+        path.write_bytes((line * 1500).encode("utf-8"))
+        paths.append(path)
+    assert all(path.stat().st_size > PREFETCH_MAX_BYTES for path in paths)
+
+    for cache in (None, ReadCache()):
+        out = io.StringIO()
+        write_export(out, paths, workers=workers, cache=cache)
+        assert out.getvalue() == "".join(baseline_entry(path) for path in paths)
+
+def test_line_breaks_are_translated_in_files_output(files, tmp_path):
+    out_path = tmp_path / "export.txt"
+    export_files(files, out_path)
+    data = out_path.read_bytes()
+    assert b"\r" not in data
+    assert b"line1\nline2\n\n" in data
+
+def test_jsonl_content_uses_newlines(files):
+    out = io.StringIO()
+    write_jsonl(out, files)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["content"] for r in records] == [
+        path.read_text(encoding="utf-8-sig") for path in files
+    ]
+
+def test_split_pieces_translate_line_breaks(tmp_path):
+    path = tmp_path / "crlf.txt"
+    lines = [f"line {n}" for n in range(500)]
+    path.write_bytes("\r\n".join(lines).encode("utf-8"))
+
+    result = split_export([path], tmp_path / "export.txt", 500)
+
+    written = []
+    for part in result.parts[:-1]:
+        body = part.read_bytes().split(b"\n", 1)[1]
+        assert b"\r" not in body
+        written.extend(body.decode("utf-8").strip("\n").split("\n"))
+    assert written == lines
+
+def test_cancelled_export_does_not_poison_the_read_cache(files, tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    cancel = threading.Event()
+    cancel.set()
+
+    result = write_export(io.StringIO(), files, cancel=cancel, workers=8,
+                          cache=ReadCache(disk_dir=cache_dir))
+    assert result.cancelled
+
+    for cache in (ReadCache(disk_dir=cache_dir), ReadCache(disk_dir=cache_dir)):
+        out = io.StringIO()
+        write_export(out, files, workers=8, cache=cache)
+        assert out.getvalue() == "".join(baseline_entry(path) for path in files)
@@ -0,0 +1,81 @@
+import shutil
+import subprocess
+
+import pytest
+
+from git_index import read_index, tracked_files, tracked_listings
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+PATHS = [
+    "README.md",
+    "src/app/__init__.py",
+    "src/app/main.py",
+    "src/app/main_test.py",
+    "src/lib/util.py",
+    "src/lib/util_extra.py",
+    "docs/guide.md",
+]
+
+def git(repo, *args):
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+@pytest.fixture
+def repo(tmp_path):
+    git(tmp_path, "init", "-q")
+    for rel in PATHS:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"# {rel}\n")
+    git(tmp_path, "add", ".")
+    return tmp_path
+
+def index_order(paths):
+    # Git sorts index entries by their raw path bytes
+    return sorted(paths, key=lambda p: p.encode("utf-8"))
+
+@pytest.mark.parametrize("version", [2, 3, 4])
+def test_reads_every_index_version(repo, version):
+    git(repo, "update-index", "--index-version", str(version))
+    assert read_index(repo / ".git") == index_order(PATHS)
+
+def test_v4_path_compression_across_directories(repo):
+    # Long shared prefixes, then a path sharing nothing with the one before
+    extra = ["src/app/main_test_helpers.py", "src/app/main_test_helpers_more.py", "zzz.txt"]
+    for rel in extra:
+        (repo / rel).write_text("x\n")
+    git(repo, "add", ".")
+    git(repo, "update-index", "--index-version", "4")
+    assert read_index(repo / ".git") == index_order(PATHS + extra)
+
+@pytest.mark.parametrize("version", [3, 4])
+def test_skip_worktree_entries_are_left_out(repo, version):
+    git(repo, "update-index", "--skip-worktree", "src/lib/util.py", "docs/guide.md")
+    git(repo, "update-index", "--index-version", str(version))
+    expected = [p for p in index_order(PATHS) if p not in ("src/lib/util.py", "docs/guide.md")]
+    assert read_index(repo / ".git") == expected
+
+def test_submodule_entries_are_left_out(repo):
+    git(repo, "update-index", "--add", "--cacheinfo",
+        "160000,1234567890123456789012345678901234567890,vendor/sub")
+    assert "vendor/sub" not in read_index(repo / ".git")
+
+def test_tracked_files_are_relative_to_a_subfolder(repo):
+    assert tracked_files(repo / "src") == [
+        "app/__init__.py", "app/main.py", "app/main_test.py", "lib/util.py", "lib/util_extra.py",
+    ]
+
+def test_tracked_files_outside_a_repository(tmp_path):
+    assert tracked_files(tmp_path) is None
+
+def test_unsupported_index_is_reported(repo):
+    (repo / ".git" / "index").write_bytes(b"DIRC" + (9).to_bytes(4, "big") + bytes(4))
+    with pytest.raises(ValueError):
+        read_index(repo / ".git")
+    assert tracked_files(repo) is None
+
+def test_listings_link_every_ancestor():
+    listings = tracked_listings(["a/b/c.py", "a/d.py", "e.py"])
+    assert listings[""] == ({"a"}, ["e.py"])
+    assert listings["a"] == ({"b"}, ["d.py"])
+    assert listings["a/b"] == (set(), ["c.py"])
@@ -0,0 +1,19 @@
+import api
+from gitignore import IgnoreRules
+
+def test_reversed_range_matches_nothing():
+    rules = IgnoreRules(["[z-a]", "*.log", "[!z-a].tmp"])
+    assert rules.match("a", False) is None
+    assert rules.match("z", False) is None
+    assert rules.match("debug.log", False) is True
+    assert rules.match("x.tmp", False) is True
+
+def test_bad_class_does_not_disable_other_rules(tmp_path):
+    (tmp_path / ".gitignore").write_text("[z-a]\n*.log\n")
+    (tmp_path / "keep.py").write_text("print(1)\n")
+    (tmp_path / "debug.log").write_text("noise\n")
+
+    names = [path.name for path in api.scan(tmp_path)]
+
+    assert "keep.py" in names
+    assert "debug.log" not in names
@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("tkinter")
+pytest.importorskip("tkinterdnd2")
+
+from gui import export_worker
+from jobs import BackgroundJob
+from profiling import NULL_TRACE
+from read_cache import ReadCache
+
+def run_job(*args, **kwargs):
+    job = BackgroundJob(lambda job: export_worker(job, *args, **kwargs)).start()
+    kinds = []
+    while not kinds or kinds[-1] not in ("done", "error", "cancelled"):
+        kind, payload = job.messages.get(timeout=10)
+        assert kind != "error", payload
+        kinds.append(kind)
+    return kinds
+
+@pytest.mark.parametrize("split_tokens", [None, 100])
+def test_export_worker_without_tracing(tmp_path, split_tokens):
+    files = []
+    for n in range(5):
+        path = tmp_path / f"f{n}.py"
+        path.write_text(f"print({n})\n" * 10)
+        files.append(path)
+
+    kinds = run_job(
+        files, tmp_path / "export.txt", ReadCache(), NULL_TRACE,
+        split_tokens=split_tokens, tokens=[60] * len(files),
+    )
+
+    assert kinds[-2:] == ["result", "done"]
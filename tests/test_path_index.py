@@ -0,0 +1,52 @@
+from path_index import PathIndex
+
+PATHS = [
+    "README.md",
+    "src/app.py",
+    "src/util/helpers.py",
+    "src/util/data.json",
+    "docs/guide.md",
+    "tests/test_app.py",
+    "build.py/readme.txt",
+]
+
+def make_index():
+    index = PathIndex()
+    # Filled in batches, like the scan streams them in
+    index.add(PATHS[:3])
+    index.add(PATHS[3:])
+    return index
+
+def search(index, query, mode="glob", start=0):
+    return [PATHS[i] for i in index.search(query, mode, start)]
+
+def test_glob_without_slash_matches_names_at_any_depth():
+    index = make_index()
+    assert search(index, "*.py") == [
+        "src/app.py", "src/util/helpers.py", "tests/test_app.py", "build.py/readme.txt",
+    ]
+    assert search(index, "util") == ["src/util/helpers.py", "src/util/data.json"]
+    assert search(index, "readme*") == ["README.md", "build.py/readme.txt"]
+    assert search(index, "*") == PATHS
+    assert search(index, "*.") == []
+
+def test_glob_with_slash_matches_whole_paths():
+    index = make_index()
+    assert search(index, "src/*.py") == ["src/app.py"]
+    assert search(index, "src/**/*.py") == ["src/app.py", "src/util/helpers.py"]
+
+def test_search_from_start_and_terms_combine():
+    index = make_index()
+    assert search(index, "*.py", start=3) == ["tests/test_app.py", "build.py/readme.txt"]
+    assert search(index, "*.py test*") == ["tests/test_app.py"]
+
+def test_refined_queries_match_fresh_ones():
+    index = make_index()
+    for mode, queries in (
+        ("glob", ["*", "*.", "*.p", "*.py", "*.py s", "*.py src"]),
+        ("substring", ["s", "sr", "src", "src py"]),
+        ("fuzzy", ["s", "su", "sup", "sup h"]),
+    ):
+        for query in queries:
+            refined = search(index, query, mode)
+            assert refined == search(make_index(), query, mode), (mode, query)
@@ -0,0 +1,99 @@
+import io
+import os
+
+from exporter import write_export
+from read_cache import ReadCache, entry_key
+
+def export(paths, cache, **options):
+    out = io.StringIO()
+    write_export(out, paths, cache=cache, **options)
+    return out.getvalue()
+
+def test_get_and_put():
+    cache = ReadCache()
+    assert cache.get("a") is None
+    cache.put("a", ("text", 4, False, False))
+    assert cache.get("a") == ("text", 4, False, False)
+    assert (cache.hits, cache.disk_hits, cache.misses) == (1, 0, 1)
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ReadCache(max_memory_bytes=10)
+    cache.put("a", ("aaaa", 4, False, False))
+    cache.put("b", ("bbbb", 4, False, False))
+    cache.get("a")
+    cache.put("c", ("cccc", 4, False, False))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["memory_bytes"] <= 10
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    value = ("line1\r\nline2 😀\n", 20, True, False)
+    ReadCache(disk_dir=tmp_path).put("k", value)
+
+    cache = ReadCache(disk_dir=tmp_path)
+    assert cache.get("k") == value
+    assert cache.disk_hits == 1
+    assert cache.get("k") == value
+    assert cache.hits == 1
+
+def test_disk_tier_is_trimmed(tmp_path):
+    cache = ReadCache(disk_dir=tmp_path, max_disk_bytes=1000)
+    for n in range(20):
+        cache.put(str(n), ("x" * 100, 100, False, False))
+    assert sum(p.stat().st_size for p in tmp_path.iterdir()) <= 1000
+
+def test_key_follows_size_mtime_and_options(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("one\n")
+    st = os.stat(path)
+    key = entry_key(path, st)
+    assert entry_key(path, st, 100) != key
+
+    path.write_text("one two\n")
+    assert entry_key(path, os.stat(path)) != key
+
+def test_export_is_served_from_the_cache(tmp_path):
+    paths = []
+    for n in range(5):
+        path = tmp_path / f"f{n}.txt"
+        path.write_text(f"file {n}\n")
+        paths.append(path)
+    cache = ReadCache()
+
+    first = export(paths, cache)
+    assert cache.misses == 5
+    assert export(paths, cache) == first
+    assert cache.hits == 5
+
+def test_modified_file_is_read_again(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("old content\n")
+    cache = ReadCache()
+    assert "old content" in export([path], cache)
+
+    path.write_text("new content, longer\n")
+    text = export([path], cache)
+    assert "new content, longer" in text
+    assert "old content" not in text
+
+    # Same size and a different mtime
+    path.write_text("NEW CONTENT, LONGER\n")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert "NEW CONTENT, LONGER" in export([path], cache)
+
+def test_size_limit_is_part_of_the_key(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("0123456789" * 10)
+    cache = ReadCache()
+    full = export([path], cache)
+    limited = export([path], cache, max_file_bytes=20)
+    assert limited != full
+    assert export([path], cache) == full
+
+def test_unreadable_files_are_not_cached(tmp_path):
+    path = tmp_path / "bad.txt"
+    path.write_bytes(b"\xff\xfe\xfa not utf-8")
+    cache = ReadCache()
+    export([path], cache)
+    assert cache.stats()["memory_entries"] == 0
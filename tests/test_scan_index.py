@@ -0,0 +1,116 @@
+import os
+import time
+
+import pytest
+
+from scan_index import RACY_WINDOW_NS, ScanIndex
+from scanner import ContentFilter, iter_folder
+
+# Well outside the racy window, so stored listings are trusted
+OLD_NS = time.time_ns() - 10 * RACY_WINDOW_NS
+# Directories in the fixture tree, root included
+DIRS = 4
+
+def age(*paths, offset=0):
+    for path in paths:
+        os.utime(path, ns=(OLD_NS + offset, OLD_NS + offset))
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / "project"
+    (root / "pkg" / "sub").mkdir(parents=True)
+    (root / "docs").mkdir()
+    (root / "main.py").write_text("print(1)\n")
+    (root / "pkg" / "mod.py").write_text("x = 1\n")
+    (root / "pkg" / "sub" / "deep.py").write_text("y = 2\n")
+    (root / "docs" / "guide.md").write_text("# guide\n")
+    age(root, root / "pkg", root / "pkg" / "sub", root / "docs")
+    return root
+
+def scan(root, index_dir):
+    index = ScanIndex(root, index_dir)
+    names = [p.relative_to(root).as_posix()
+             for p in iter_folder(root, index=index, content_filter=ContentFilter())]
+    return names, index
+
+def test_unchanged_directories_are_served_from_the_index(root, tmp_path):
+    first, index = scan(root, tmp_path)
+    assert (index.hits, index.misses) == (0, DIRS)
+
+    second, index = scan(root, tmp_path)
+    assert second == first
+    assert (index.hits, index.misses) == (DIRS, 0)
+
+def test_changed_directory_is_listed_again(root, tmp_path):
+    scan(root, tmp_path)
+    (root / "pkg" / "new.py").write_text("z = 3\n")
+    age(root / "pkg", offset=1)
+
+    names, index = scan(root, tmp_path)
+    assert "pkg/new.py" in names
+    assert (index.hits, index.misses) == (DIRS - 1, 1)
+
+def test_replaced_directory_is_listed_again(root, tmp_path):
+    scan(root, tmp_path)
+    # Same name and mtime, but a different inode
+    (root / "docs").rename(root / "old_docs")
+    (root / "docs").mkdir()
+    (root / "docs" / "other.md").write_text("# other\n")
+    age(root / "docs")
+    age(root, offset=1)
+
+    names, index = scan(root, tmp_path)
+    assert "docs/other.md" in names
+    assert "docs/guide.md" not in names
+
+def test_recently_modified_directory_is_not_trusted(root, tmp_path):
+    os.utime(root / "pkg")  # now: inside the racy window
+    scan(root, tmp_path)
+
+    _, index = scan(root, tmp_path)
+    assert index.misses == 1
+
+def test_gitignore_change_relists_the_subtree(root, tmp_path):
+    gitignore = root / ".gitignore"
+    gitignore.write_text("*.md\n")
+    age(gitignore, root)
+    first, _ = scan(root, tmp_path)
+    assert "docs/guide.md" not in first
+
+    # The folder's own mtime is unchanged when a file is rewritten in place
+    gitignore.write_text("deep.py\n")
+    age(gitignore, offset=1)
+    age(root)
+
+    names, index = scan(root, tmp_path)
+    assert "docs/guide.md" in names
+    assert "pkg/sub/deep.py" not in names
+    assert index.hits == 0
+
+def test_changed_rules_drop_the_stored_index(root, tmp_path):
+    _, index = scan(root, tmp_path)
+    assert index.dirs
+
+    reloaded = ScanIndex(root, tmp_path)
+    reloaded.load("other rules")
+    assert reloaded.dirs == {}
+
+def test_removed_directories_are_dropped_on_save(root, tmp_path):
+    _, index = scan(root, tmp_path)
+    assert "docs" in index.dirs
+
+    for path in (root / "docs").iterdir():
+        path.unlink()
+    (root / "docs").rmdir()
+    age(root, offset=1)
+
+    _, index = scan(root, tmp_path)
+    assert "docs" not in index.dirs
+    reloaded = ScanIndex(root, tmp_path)
+    reloaded.load(index.rules)
+    assert "docs" not in reloaded.dirs
+
+def test_save_leaves_no_temp_files(root, tmp_path):
+    scan(root, tmp_path)
+    scan(root, tmp_path)
+    assert [p.suffix for p in tmp_path.iterdir() if p.is_file()] == [".json"]
@@ -0,0 +1,73 @@
+import pytest
+
+from dedupe import Deduplicator
+from exporter import split_export
+
+def make_tree(root):
+    files = []
+    for n in range(40):
+        path = root / f"small_{n:02d}.py"
+        path.write_text(f"# módulo {n}\n" + "print('héllo wörld')\n" * (n % 7), encoding="utf-8")
+        files.append(path)
+    for n in range(3):
+        # Identical copies, collapsed by the deduplicator
+        path = root / f"copy_{n}.txt"
+        path.write_text("the same content in every copy\n" * 5, encoding="utf-8")
+        files.append(path)
+    empty = root / "empty.txt"
+    empty.write_text("")
+    files.append(empty)
+    lines = root / "lines.txt"
+    lines.write_text("".join(f"line {n} " + "é" * (n % 50) + "\n" for n in range(2000)), encoding="utf-8")
+    files.append(lines)
+    long_line = root / "long_line.min.js"
+    long_line.write_text("var x = '" + "aé€😀" * 6000 + "';", encoding="utf-8")
+    files.append(long_line)
+    return files
+
+@pytest.mark.parametrize("limit", [300, 1000, 10000])
+@pytest.mark.parametrize("dedupe", [False, True])
+@pytest.mark.parametrize("max_file_bytes", [None, 5000])
+def test_parts_stay_within_the_limit(tmp_path, limit, dedupe, max_file_bytes):
+    src = tmp_path / "src"
+    src.mkdir()
+    files = make_tree(src)
+
+    result = split_export(
+        files, tmp_path / "export.txt", limit, max_file_bytes=max_file_bytes,
+        dedupe=Deduplicator() if dedupe else None,
+    )
+
+    parts = result.parts[:-1]
+    assert len(parts) > 1
+    for part in parts:
+        assert part.stat().st_size <= limit, part.name
+    assert result.files == len(files)
+    assert result.failed == 0
+
+def test_pieces_keep_lines_whole(tmp_path):
+    path = tmp_path / "lines.txt"
+    lines = [f"line {n} " + "é" * (n % 50) for n in range(2000)]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    result = split_export([path], tmp_path / "export.txt", 1000)
+
+    written = []
+    for part in result.parts[:-1]:
+        header, body = part.read_text(encoding="utf-8").split("\n", 1)
+        assert header.startswith(f"{path} (part ")
+        written.extend(body.rstrip("\n").split("\n"))
+    assert written == lines
+
+def test_long_line_is_cut_on_character_boundaries(tmp_path):
+    path = tmp_path / "long_line.min.js"
+    text = "aé€😀" * 5000
+    path.write_text(text, encoding="utf-8")
+
+    result = split_export([path], tmp_path / "export.txt", 1000)
+
+    pieces = []
+    for part in result.parts[:-1]:
+        assert part.stat().st_size <= 1000
+        pieces.append(part.read_text(encoding="utf-8").split("\n", 1)[1][:-2])
+    assert "".join(pieces) == text
@@ -0,0 +1,68 @@
+import re
+
+# --- Token estimation --- #
+
+# Rough stand-in for a BPE tokenizer on source code: short letter runs,
+# small digit groups, a newline plus its indentation, and single symbols
+# each count as one token. Non-ASCII bytes count one each.
+TOKEN_RE = re.compile(rb"[A-Za-z]{1,10}|\d{1,3}|\n[ \t]*|[^\sA-Za-z\d]")
+
+# Bytes of a file's prefix that are actually tokenized; the count is
+# scaled up to the full file size for larger files
+TOKEN_SAMPLE_BYTES = 1024
+
+# Fallback when no content is available at all
+BYTES_PER_TOKEN = 4
+
+def estimate_tokens(data: bytes, size: int = None) -> int:
+    """
+    Estimate the token count of a file from (a prefix of) its bytes.
+    `size` is the full file size when `data` is only a prefix.
+    """
+    sample = data[:TOKEN_SAMPLE_BYTES]
+    if not sample:
+        return 0
+    count = len(TOKEN_RE.findall(sample))
+    total = len(data) if size is None else size
+    if total > len(sample):
+        count = count * total // len(sample)
+    return max(1, count)
+
+def estimate_from_size(size: int) -> int:
+    """Estimate the token count of a file from its size alone."""
+    return (size + BYTES_PER_TOKEN - 1) // BYTES_PER_TOKEN
+
+def format_tokens(count: int) -> str:
+    """Short human form: 950, 12.3k, 4.1M."""
+    if count < 1000:
+        return str(count)
+    if count < 1_000_000:
+        return f"{count / 1000:.1f}k"
+    return f"{count / 1_000_000:.1f}M"
+
+# --- Budgeting --- #
+
+PRIORITIES = ("order", "small")
+
+def fit_budget(token_counts, budget: int, priority: str = "order"):
+    """
+    Pick the indexes of files whose estimated tokens fit into `budget`.
+    "order" takes files in list order and skips any that no longer fit;
+    "small" takes the smallest files first to include as many as possible.
+    The returned indexes are in list order.
+    """
+    order = range(len(token_counts))
+    if priority == "small":
+        order = sorted(order, key=lambda i: token_counts[i])
+    elif priority != "order":
+        raise ValueError(f"unknown priority: {priority!r}")
+
+    chosen = []
+    used = 0
+    for i in order:
+        cost = token_counts[i]
+        if used + cost <= budget:
+            chosen.append(i)
+            used += cost
+    chosen.sort()
+    return chosen
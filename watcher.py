@@ -0,0 +1,253 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+# --- Watch settings --- #
+
+# A burst of changes is reported once it has been quiet for this long...
+DEBOUNCE_SECONDS = 0.3
+# ...or at the latest this long after its first change
+MAX_WAIT_SECONDS = 2.0
+# How often the polling fallback stats the watched directories
+POLL_INTERVAL_SECONDS = 1.0
+
+# inotify event flags (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+class Changes:
+    """One debounced batch: changed directories and (old, new) renames."""
+
+    __slots__ = ("dirs", "renames")
+
+    def __init__(self):
+        self.dirs = set()
+        self.renames = []
+
+    def __bool__(self):
+        return bool(self.dirs or self.renames)
+
+    def update(self, other):
+        self.dirs |= other.dirs
+        self.renames.extend(other.renames)
+
+# --- inotify (Linux) --- #
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch, libc.inotify_rm_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+class InotifyWatcher:
+    """
+    Watches every scanned directory with inotify. Moves within the tree
+    are reported as renames when both halves of the move are seen.
+    """
+
+    def __init__(self, root: Path, libc):
+        self.root = Path(root)
+        self._libc = libc
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._lock = threading.Lock()
+        self._by_wd = {}   # watch descriptor -> rel dir
+        self._by_dir = {}  # rel dir -> watch descriptor
+        self._moves = {}   # cookie -> rel path moved away
+
+    def set_dirs(self, dirs):
+        """Watch exactly the given relative directories."""
+        dirs = set(dirs)
+        with self._lock:
+            for rel_dir in self._by_dir.keys() - dirs:
+                wd = self._by_dir.pop(rel_dir)
+                self._by_wd.pop(wd, None)
+                self._libc.inotify_rm_watch(self._fd, wd)
+            for rel_dir in dirs - self._by_dir.keys():
+                path = self.root / rel_dir if rel_dir else self.root
+                wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+                if wd < 0:
+                    errno = ctypes.get_errno()
+                    if errno == 28:  # ENOSPC: out of watches
+                        raise OSError(errno, "inotify watch limit reached")
+                    continue  # removed in the meantime
+                self._by_wd[wd] = rel_dir
+                self._by_dir[rel_dir] = wd
+
+    def wait(self, timeout: float) -> Changes:
+        changes = Changes()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return changes
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changes
+
+        with self._lock:
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+
+                rel_dir = self._by_wd.get(wd)
+                if rel_dir is None:
+                    continue
+                if mask & IN_IGNORED:
+                    del self._by_wd[wd]
+                    self._by_dir.pop(rel_dir, None)
+                changes.dirs.add(rel_dir)
+
+                rel = f"{rel_dir}/{name}" if rel_dir else name
+                if mask & IN_MOVED_FROM:
+                    self._moves[cookie] = rel
+                elif mask & IN_MOVED_TO:
+                    old = self._moves.pop(cookie, None)
+                    if old is not None:
+                        changes.renames.append((old, rel))
+        return changes
+
+    def close(self):
+        with self._lock:
+            fd, self._fd = self._fd, -1
+        if fd >= 0:
+            os.close(fd)
+
+# --- Polling fallback --- #
+
+class PollingWatcher:
+    """
+    Stats the scanned directories (and their .gitignore files) every
+    POLL_INTERVAL_SECONDS and reports those whose mtime changed, the same
+    signal the scan index uses to decide which directories to re-list.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._mtimes = {}
+        self._next_poll = time.monotonic() + POLL_INTERVAL_SECONDS
+
+    def _stat(self, rel_dir):
+        path = self.root / rel_dir if rel_dir else self.root
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        try:
+            return mtime, os.stat(path / ".gitignore").st_mtime_ns
+        except OSError:
+            return mtime, 0
+
+    def set_dirs(self, dirs):
+        # Known directories keep their last seen mtime, so a change made
+        # while the caller was re-listing is still reported next poll
+        with self._lock:
+            known = dict(self._mtimes)
+        mtimes = {
+            rel_dir: known[rel_dir] if rel_dir in known else self._stat(rel_dir)
+            for rel_dir in dirs
+        }
+        with self._lock:
+            self._mtimes = mtimes
+
+    def wait(self, timeout: float) -> Changes:
+        changes = Changes()
+        delay = self._next_poll - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return changes
+        time.sleep(max(0.0, delay))
+        self._next_poll = time.monotonic() + POLL_INTERVAL_SECONDS
+
+        with self._lock:
+            for rel_dir, old in self._mtimes.items():
+                new = self._stat(rel_dir)
+                if new != old:
+                    self._mtimes[rel_dir] = new
+                    changes.dirs.add(rel_dir)
+        return changes
+
+    def close(self):
+        pass
+
+def create_watcher(root: Path, dirs):
+    """inotify on Linux when possible, polling everywhere else."""
+    libc = _load_libc()
+    if libc is not None:
+        watcher = None
+        try:
+            watcher = InotifyWatcher(root, libc)
+            watcher.set_dirs(dirs)
+            return watcher
+        except OSError:
+            if watcher is not None:
+                watcher.close()
+    watcher = PollingWatcher(root)
+    watcher.set_dirs(dirs)
+    return watcher
+
+# --- Debounced watch loop --- #
+
+def watch_worker(job, root, dirs, debounce=DEBOUNCE_SECONDS, max_wait=MAX_WAIT_SECONDS):
+    """
+    BackgroundJob target: watch `dirs` under `root` and post one "changed"
+    message (a Changes batch) per burst of filesystem activity until the
+    job is cancelled. The watcher is available as `job.watcher`.
+    """
+    watcher = job.watcher = create_watcher(root, dirs)
+    pending = Changes()
+    first = last = 0.0
+    try:
+        while not job.cancelled:
+            changes = watcher.wait(0.1)
+            now = time.monotonic()
+            if changes:
+                if not pending:
+                    first = now
+                pending.update(changes)
+                last = now
+            if pending and (now - last >= debounce or now - first >= max_wait):
+                job.post("changed", pending)
+                pending = Changes()
+    finally:
+        watcher.close()
+
+def tree_dirs(tree):
+    """Relative paths of every directory in a scanned DirNode tree."""
+    dirs = []
+    stack = [("", tree)]
+    while stack:
+        rel_dir, node = stack.pop()
+        dirs.append(rel_dir)
+        prefix = rel_dir + "/" if rel_dir else ""
+        stack.extend((prefix + child.name, child) for child in node.dirs)
+    return dirs